@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Atomic replacement of output, cache, state and metrics files.
+
+atomic_write() writes to a uniquely named temporary file in the target's
+directory and renames it over the target only when the write succeeds, so
+an interrupted run leaves the previous file (or nothing) in place, and two
+concurrent runs never write into the same temporary file. The temporary file
+is created with the mode open() gives a new file, the kernel applying the
+process umask, so the umask is never read or changed here. A file that is
+replaced keeps its own permissions.
+"""
+
+import os
+import stat
+import secrets
+from contextlib import contextmanager
+
+def _create_temp_file(path):
+    """
+    Create a new, empty temporary file next to path.
+    
+    Returns:
+        tuple: (fd, temp_file) for the file, opened for writing
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    while True:
+        temp_file = os.path.join(directory, f".{name}.{secrets.token_hex(6)}.tmp")
+        try:
+            return os.open(temp_file, flags, 0o666), temp_file
+        except FileExistsError:
+            continue
+
+@contextmanager
+def atomic_write(output_file, mode='w', **open_kwargs):
+    """
+    Open a temporary file that replaces output_file only if the block succeeds.
+    
+    Args:
+        output_file (str): Path of the file to write
+        mode (str): File mode passed to open, 'w' or 'wb'
+        **open_kwargs: Extra arguments for open, e.g. encoding or newline
+    """
+    fd, temp_file = _create_temp_file(output_file)
+    try:
+        with os.fdopen(fd, mode, **open_kwargs) as f:
+            yield f
+        try:
+            os.chmod(temp_file, stat.S_IMODE(os.stat(output_file).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(temp_file, output_file)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
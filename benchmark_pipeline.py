@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Synthetic benchmark for the dataset analysis pipeline.
+
+Generates a ground_truth-like corpus (Synapse IDs, UUIDs, hashes, NA-heavy
+columns and the real header vocabulary) at any scale, then times each stage
+of the analysis separately and records the results as JSON. A previous
+results file made with the same configuration can be passed as a baseline
+to flag throughput regressions.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import numpy as np
+import pandas as pd
+
+import identify_computer_generated_columns as identify
+import schema_column_comparison as schema_comparison
+import filter_evaluatable_columns as filtering
+import compare_cim_vs_groundtruth as comparison
+from atomic_files import atomic_write
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_FILE = os.path.join(SCRIPT_DIR, 'NF.jsonld')
+EVALUATABLE_COLUMNS_FILE = os.path.join(SCRIPT_DIR, 'CIM_curated_NF_schema_column_list_7_11_25.csv')
+
+NA_TOKENS = ['Not Applicable', 'NA', 'Unknown', '']
+
+# Real ground_truth headers and the kind of values generated for each
+HEADER_VOCABULARY = {
+    'id': 'synapse_id',
+    'name': 'file_name',
+    'specimenID': 'sample_id',
+    'individualID': 'sample_id',
+    'studyId': 'synapse_id',
+    'entityId': 'synapse_id',
+    'parentId': 'synapse_id',
+    'benefactorId': 'synapse_id',
+    'etag': 'uuid',
+    'dataFileMD5Hex': 'hex_hash',
+    'dataFileHandleId': 'handle_id',
+    'createdOn': 'timestamp',
+    'modifiedOn': 'timestamp',
+    'createdBy': 'handle_id',
+    'modifiedBy': 'handle_id',
+    'currentVersion': 'small_int',
+    'dataFileSizeBytes': 'size',
+    'age': 'age',
+    'readPair': 'small_int',
+    'ageUnit': ['years', 'months', 'days'],
+    'assay': ['RNA-seq', 'SNP array', 'methylation array', 'whole exome sequencing', 'ChIP-seq'],
+    'dataSubtype': ['raw', 'processed', 'normalized'],
+    'dataType': ['genomicVariants', 'geneExpression', 'image', 'drugScreen'],
+    'diagnosis': ['Neurofibromatosis type 1', 'Neurofibromatosis type 2', 'Schwannomatosis'],
+    'fileFormat': ['fastq', 'csv', 'bam', 'idat', 'txt', 'vcf'],
+    'fundingAgency': ['NTAP', 'CTF', 'NIH-NCI', 'DHART SPORE'],
+    'initiative': ['Synodos', 'Francis S. Collins Scholars Program', 'Other'],
+    'isCellLine': ['Yes', 'No'],
+    'isPrimaryCell': ['Yes', 'No'],
+    'isXenograft': ['Yes', 'No'],
+    'nf1Genotype': ['-/-', '+/-', '+/+', 'Unknown'],
+    'nf2Genotype': ['-/-', '+/-', '+/+', 'Unknown'],
+    'nucleicAcidSource': ['bulk cell', 'single cell', 'mitochondria'],
+    'platform': ['Illumina HiSeq 2500', 'Illumina NovaSeq 6000', 'Illumina HumanOmniExpress-24 v1.0 BeadChip'],
+    'resourceType': ['experimentalData'],
+    'sex': ['Female', 'Male'],
+    'species': ['Homo sapiens', 'Mus musculus'],
+    'studyName': ['Genomic Characterization of MPNST Cell Lines', 'Cutaneous Neurofibroma Data Resource'],
+    'tumorType': ['Malignant Peripheral Nerve Sheath Tumor', 'Plexiform Neurofibroma', 'Cutaneous Neurofibroma'],
+    'organ': ['brain', 'skin', 'nerves'],
+    'tissue': ['primary tumor', 'blood', 'nerve tissue'],
+    'modelSystemName': 'sample_id',
+    'parentSpecimenID': 'sample_id',
+    'progressReportNumber': 'na_heavy',
+    'experimentalCondition': 'na_heavy',
+    'timePointUnit': 'na_heavy',
+    'transplantationType': 'na_heavy',
+    'compoundName': 'na_heavy'
+}
+
+# Columns every generated file has, like the columns present in all 38 real files
+CORE_COLUMNS = ['id', 'name', 'specimenID', 'individualID', 'studyId', 'assay', 'dataSubtype',
+                'dataType', 'fileFormat', 'resourceType', 'species', 'tumorType']
+
+def generate_column(kind, rows, rng):
+    """
+    Generate the values of one synthetic column.
+    
+    Args:
+        kind: A value kind name, or a list of categories to sample from
+        rows (int): Number of values
+        rng: numpy Generator
+    
+    Returns:
+        numpy array of values
+    """
+    if isinstance(kind, list):
+        values = rng.choice(kind, rows).astype(object)
+        # Real categorical columns carry a sprinkling of NA tokens
+        values[rng.random(rows) < 0.1] = rng.choice(NA_TOKENS)
+        return values
+    if kind == 'synapse_id':
+        return np.char.add('syn', rng.integers(10 ** 7, 10 ** 8, rows).astype(str))
+    if kind == 'sample_id':
+        return np.char.add('MPNST-', rng.integers(1, max(2, rows // 3), rows).astype(str))
+    if kind == 'file_name':
+        return np.char.add(np.char.add('sample_', np.arange(rows).astype(str)), '.fastq.gz')
+    if kind == 'uuid':
+        raw = rng.bytes(16 * rows)
+        return np.array([str(uuid.UUID(bytes=raw[i:i + 16])) for i in range(0, 16 * rows, 16)], dtype=object)
+    if kind == 'hex_hash':
+        raw = rng.bytes(16 * rows).hex()
+        return np.array([raw[i:i + 32] for i in range(0, 32 * rows, 32)], dtype=object)
+    if kind == 'handle_id':
+        return rng.integers(10 ** 6, 10 ** 9, rows)
+    if kind == 'timestamp':
+        return rng.integers(1_500_000_000_000, 1_700_000_000_000, rows)
+    if kind == 'small_int':
+        return rng.integers(1, 3, rows)
+    if kind == 'size':
+        return rng.integers(10 ** 3, 10 ** 10, rows)
+    if kind == 'age':
+        return np.round(rng.uniform(1, 80, rows), 2)
+    if kind == 'na_heavy':
+        return rng.choice(NA_TOKENS + ['value'], rows, p=[0.3, 0.3, 0.2, 0.15, 0.05]).astype(object)
+    raise ValueError(f"Unknown column kind: {kind}")
+
+def generate_corpus(data_dir, files, rows, columns, seed=0):
+    """
+    Write a synthetic corpus to data_dir/ground_truth as nf_<n>.csv files.
+    
+    Args:
+        data_dir (str): Directory to create ground_truth in
+        files (int): Number of CSV files
+        rows (int): Rows per file
+        columns (int): Columns per file (at least the core columns)
+        seed (int): Random seed
+    
+    Returns:
+        dict: Number of files, rows, cells and bytes written
+    """
+    rng = np.random.default_rng(seed)
+    ground_truth_dir = os.path.join(data_dir, 'ground_truth')
+    os.makedirs(ground_truth_dir, exist_ok=True)
+    
+    optional_columns = [col for col in HEADER_VOCABULARY if col not in CORE_COLUMNS]
+    extra = max(0, min(columns, len(HEADER_VOCABULARY)) - len(CORE_COLUMNS))
+    total_bytes = 0
+    
+    for n in range(1, files + 1):
+        header = CORE_COLUMNS + list(rng.choice(optional_columns, extra, replace=False))
+        df = pd.DataFrame({col: generate_column(HEADER_VOCABULARY[col], rows, rng) for col in header})
+        path = os.path.join(ground_truth_dir, f"nf_{n}.csv")
+        df.to_csv(path, index=False)
+        total_bytes += os.path.getsize(path)
+    
+    return {
+        'files': files,
+        'rows': files * rows,
+        'cells': files * rows * (len(CORE_COLUMNS) + extra),
+        'bytes': total_bytes
+    }
+
+@contextlib.contextmanager
+def _quiet():
+    """Discard the progress output the pipeline functions print."""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+# Run settings that must match for two results files to be comparable
+COMPARABLE_CONFIG = ['files', 'rows', 'columns', 'workers', 'sample']
+
+def _rate(count, seconds):
+    """Return count per second, or None when either is unknown or zero."""
+    return round(count / seconds, 3) if count is not None and seconds > 0 else None
+
+def _timed(stages, name, items, func, *args, rows=None, cells=None, **kwargs):
+    """
+    Run func, record its wall time and throughput under stages[name], and return its result.
+    Stages that read the corpus also pass the rows and cells they process,
+    for rows/sec and cells/sec.
+    """
+    start_time = time.perf_counter()
+    with _quiet():
+        result = func(*args, **kwargs)
+    seconds = time.perf_counter() - start_time
+    stages[name] = {
+        'seconds': round(seconds, 6),
+        'items': items,
+        'items_per_sec': _rate(items, seconds),
+        'rows': rows,
+        'rows_per_sec': _rate(rows, seconds),
+        'cells': cells,
+        'cells_per_sec': _rate(cells, seconds)
+    }
+    rate = f", {stages[name]['cells_per_sec']:.0f} cells/s" if cells is not None and seconds > 0 else ""
+    print(f"  {name}: {seconds:.3f}s ({items} items{rate})")
+    return result
+
+def run_benchmark(data_dir, corpus, workers=1, sampling=None):
+    """
+    Time each pipeline stage on the corpus in data_dir.
+    
+    Args:
+        data_dir (str): Directory holding ground_truth (outputs are written here too)
+        corpus (dict): Corpus totals from generate_corpus
+        workers (int): Worker processes for stages that support them
+        sampling (dict): sample_csv_file options for analyze_csv_files;
+            None samples the first rows
+    
+    Returns:
+        dict: Stage name -> seconds, items, rows and cells, each with a
+            per-second rate (rows and cells are None for stages that do not
+            read the corpus)
+    """
+    stages = {}
+    ground_truth_dir = os.path.join(data_dir, 'ground_truth')
+    cim_update_dir = os.path.join(data_dir, 'CIM_update')
+    os.makedirs(cim_update_dir, exist_ok=True)
+    csv_files = identify.get_csv_files(ground_truth_dir)
+    # Every generated file has the same shape
+    rows_per_file = corpus['rows'] / max(corpus['files'], 1)
+    cells_per_file = corpus['cells'] / max(corpus['files'], 1)
+    
+    previous_dir = os.getcwd()
+    os.chdir(data_dir)
+    try:
+        # Head sampling only reads the first rows of each file
+        sampled_rows = rows_per_file if sampling else min(rows_per_file, 5)
+        _timed(stages, 'analyze_csv_files', len(csv_files),
+               identify.analyze_csv_files, ground_truth_dir, workers=workers, use_cache=False, sampling=sampling,
+               rows=int(sampled_rows * len(csv_files)),
+               cells=int(sampled_rows * cells_per_file / max(rows_per_file, 1) * len(csv_files)))
+        
+        schema_properties = schema_comparison.extract_schema_properties(SCHEMA_FILE)
+        columns = schema_comparison.load_column_summary('column_classification_summary.csv')
+        _timed(stages, 'compare_columns_to_schema', len(columns),
+               schema_comparison.compare_columns_to_schema, columns, schema_properties)
+        
+        with _quiet():
+            evaluatable_columns = filtering.get_evaluatable_columns(EVALUATABLE_COLUMNS_FILE)
+        # The filtered files double as the CIM_update side of the comparison
+        _timed(stages, 'filter_csv_file', len(csv_files),
+               filtering.filter_csv_files, csv_files, cim_update_dir, evaluatable_columns, workers=workers,
+               rows=corpus['rows'], cells=corpus['cells'])
+        
+        file_pairs = [(path, os.path.join(cim_update_dir, f"filtered_{os.path.basename(path)}"))
+                      for path in csv_files]
+        file_pairs = [(gt_file, cim_file) for gt_file, cim_file in file_pairs if os.path.exists(cim_file)]
+        all_comparisons = _timed(stages, 'compare_files', len(file_pairs),
+                                 comparison.compare_file_pairs, file_pairs, workers=workers,
+                                 rows=int(rows_per_file * len(file_pairs)), cells=int(cells_per_file * len(file_pairs)))
+        
+        removed_column_patterns = comparison.analyze_removed_columns(all_comparisons)
+        categorized_removals = comparison.categorize_removed_columns(removed_column_patterns)
+        _timed(stages, 'generate_markdown_report', len(all_comparisons),
+               comparison.generate_markdown_report, all_comparisons, removed_column_patterns, categorized_removals)
+    finally:
+        os.chdir(previous_dir)
+    
+    return stages
+
+def config_differences(results, baseline):
+    """Return the COMPARABLE_CONFIG keys whose values differ between two results files."""
+    config = results.get('config', {})
+    # Results written before the sample option existed all sampled the head
+    base_config = {'sample': 'head', **baseline.get('config', {})}
+    return [key for key in COMPARABLE_CONFIG if config.get(key) != base_config.get(key)]
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compare stage throughput with a baseline run made with the same config.
+    Stages are compared by cells/sec, or by items/sec for stages that do
+    not read the corpus.
+    
+    Args:
+        results (dict): Results of this run
+        baseline (dict): Results of an earlier run
+        tolerance (float): Allowed fractional throughput drop, e.g. 0.2
+    
+    Returns:
+        list: (stage, unit, baseline_rate, rate) for each regressed stage
+    """
+    regressions = []
+    for name, stage in results['stages'].items():
+        base_stage = baseline.get('stages', {}).get(name)
+        if not base_stage:
+            continue
+        for key, unit in [('cells_per_sec', 'cells/s'), ('items_per_sec', 'items/s')]:
+            if stage.get(key) and base_stage.get(key):
+                if stage[key] < base_stage[key] * (1 - tolerance):
+                    regressions.append((name, unit, base_stage[key], stage[key]))
+                break
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline on a synthetic corpus.")
+    parser.add_argument('--files', type=int, default=38, help="Number of synthetic CSV files (default: 38)")
+    parser.add_argument('--rows', type=int, default=100, help="Rows per file (default: 100)")
+    parser.add_argument('--columns', type=int, default=30, help="Columns per file (default: 30)")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes for parallel stages (default: 1)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for the generator (default: 0)")
+    parser.add_argument('--sample', choices=['head', 'reservoir'], default='head',
+                        help="Sample mode for analyze_csv_files (default: head)")
+    parser.add_argument('--data-dir', default=None,
+                        help="Directory for the corpus and outputs (default: a temporary directory)")
+    parser.add_argument('--keep-data', action='store_true', help="Keep the generated corpus and outputs")
+    parser.add_argument('--output', default='benchmark_results.json', help="Results JSON file")
+    parser.add_argument('--baseline', default=None, help="Earlier results JSON to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed throughput drop versus the baseline (default: 0.2)")
+    args = parser.parse_args()
+    
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    
+    sampling = {'max_samples': 5} if args.sample == 'reservoir' else None
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix='nf_benchmark_')
+    try:
+        print(f"Generating {args.files} files x {args.rows} rows x {args.columns} columns in {data_dir}...")
+        start_time = time.perf_counter()
+        corpus = generate_corpus(data_dir, args.files, args.rows, args.columns, args.seed)
+        corpus['generation_seconds'] = round(time.perf_counter() - start_time, 6)
+        
+        print("Timing stages...")
+        stages = run_benchmark(data_dir, corpus, workers=args.workers, sampling=sampling)
+    finally:
+        if not args.keep_data and not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {
+            'files': args.files,
+            'rows': args.rows,
+            'columns': args.columns,
+            'workers': args.workers,
+            'sample': args.sample,
+            'seed': args.seed
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'cpu_count': os.cpu_count()
+        },
+        'corpus': corpus,
+        'stages': stages
+    }
+    with atomic_write(args.output, encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to: {args.output}")
+    
+    if baseline is not None:
+        differences = config_differences(results, baseline)
+        if differences:
+            for key in differences:
+                print(f"Config mismatch: {key} is {results['config'].get(key)!r} here, "
+                      f"{baseline.get('config', {}).get(key)!r} in the baseline")
+            print("Baseline was run with a different configuration; not comparing throughput")
+            sys.exit(2)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for name, unit, base_rate, rate in regressions:
+            print(f"REGRESSION: {name} {rate:.1f} {unit} vs baseline {base_rate:.1f} {unit}")
+        if regressions:
+            sys.exit(1)
+        print("No throughput regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -5,81 +5,316 @@ and generate a comprehensive report of modifications made.
 """
 
 import pandas as pd
+import numpy as np
 import os
-import glob
+import csv
+import time
+import argparse
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from atomic_files import atomic_write
+from csv_cache import cached_columns, read_csv_projected
+from run_metrics import add_metrics_arguments, collect_metrics
+from value_normalization import load_normalizer
+from dataset_loader import DEFAULT_PREFETCH, add_prefetch_argument, cim_update_pairs, prefetched
 
-def compare_files(ground_truth_file, cim_update_file):
+# Columns tried in order as the key that aligns ground truth and CIM rows
+ROW_KEY_CANDIDATES = ['id', 'specimenID', 'name']
+
+def choose_row_key(gt_df, cim_df):
+    """
+    Pick the column used to align rows between the two files.
+    
+    Prefers the first candidate in ROW_KEY_CANDIDATES present in both files
+    and unique in each, then the first candidate present in both.
+    
+    Returns:
+        str: Key column name, or None to align rows by position
+    """
+    shared = [col for col in ROW_KEY_CANDIDATES if col in gt_df.columns and col in cim_df.columns]
+    for col in shared:
+        if gt_df[col].is_unique and cim_df[col].is_unique:
+            return col
+    return shared[0] if shared else None
+
+def _comparable_columns(gt_df, cim_df, columns):
+    """
+    Return copies of the shared columns with matching dtypes, so equal values hash equally.
+    Only columns whose dtypes differ are converted: numeric pairs to float64,
+    anything else to strings (missing values stay missing).
+    """
+    gt = gt_df[columns].copy()
+    cim = cim_df[columns].copy()
+    for col in columns:
+        if gt[col].dtype == cim[col].dtype:
+            continue
+        if pd.api.types.is_numeric_dtype(gt[col]) and pd.api.types.is_numeric_dtype(cim[col]):
+            gt[col] = gt[col].astype('float64')
+            cim[col] = cim[col].astype('float64')
+        else:
+            gt[col] = gt[col].astype(object).where(gt[col].isna(), gt[col].astype(str))
+            cim[col] = cim[col].astype(object).where(cim[col].isna(), cim[col].astype(str))
+    return gt, cim
+
+def _row_keys(df, key):
+    """
+    Index rows by (key value, occurrence) so repeated key values still align one-to-one.
+    Without a key column the rows are indexed by position.
+    """
+    if key is None:
+        return pd.MultiIndex.from_arrays([range(len(df)), [0] * len(df)], names=['key', 'occurrence'])
+    
+    values = df[key].astype(object).where(df[key].notna(), '<missing>')
+    occurrence = values.groupby(values, sort=False).cumcount()
+    return pd.MultiIndex.from_arrays([values.to_numpy(), occurrence.to_numpy()], names=['key', 'occurrence'])
+
+def diff_rows(gt_df, cim_df, key=None):
+    """
+    Report which rows and cells differ between a ground truth and CIM file.
+    
+    Rows are aligned on a key column and each row is fingerprinted by hashing
+    its values, so only rows whose fingerprints differ are compared cell by
+    cell. All steps are hash-based, so the cost is linear in the number of cells.
+    
+    Args:
+        gt_df: Ground truth DataFrame
+        cim_df: CIM update DataFrame
+        key (str): Column to align rows on; defaults to choose_row_key()
+        
+    Returns:
+        dict: Row-level differences over the columns both frames share:
+            key, rows_added and rows_removed ((key, occurrence) tuples),
+            rows_modified, and modified_cells (dicts with key, occurrence,
+            column, gt_value and cim_value)
+    """
+    if key is None:
+        key = choose_row_key(gt_df, cim_df)
+    columns = [col for col in gt_df.columns if col in cim_df.columns]
+    
+    gt, cim = _comparable_columns(gt_df, cim_df, columns)
+    gt.index = _row_keys(gt_df, key)
+    cim.index = _row_keys(cim_df, key)
+    
+    shared_rows = gt.index.intersection(cim.index, sort=False)
+    result = {
+        'key': key if key is not None else '(row position)',
+        'rows_added': list(cim.index.difference(gt.index, sort=False)),
+        'rows_removed': list(gt.index.difference(cim.index, sort=False)),
+        'rows_modified': 0,
+        'modified_cells': []
+    }
+    if not columns or len(shared_rows) == 0:
+        return result
+    
+    gt_shared = gt.loc[shared_rows]
+    cim_shared = cim.loc[shared_rows]
+    row_changed = (pd.util.hash_pandas_object(gt_shared, index=False).to_numpy() !=
+                   pd.util.hash_pandas_object(cim_shared, index=False).to_numpy())
+    result['rows_modified'] = int(row_changed.sum())
+    if not row_changed.any():
+        return result
+    
+    gt_changed = gt_shared[row_changed]
+    cim_changed = cim_shared[row_changed]
+    for col in columns:
+        cell_changed = (pd.util.hash_pandas_object(gt_changed[col], index=False).to_numpy() !=
+                        pd.util.hash_pandas_object(cim_changed[col], index=False).to_numpy())
+        if not cell_changed.any():
+            continue
+        changed_keys = gt_changed.index[cell_changed]
+        gt_values = gt_changed[col][cell_changed].tolist()
+        cim_values = cim_changed[col][cell_changed].tolist()
+        for (key_value, occurrence), gt_value, cim_value in zip(changed_keys, gt_values, cim_values):
+            result['modified_cells'].append({
+                'key': key_value,
+                'occurrence': int(occurrence),
+                'column': col,
+                'gt_value': gt_value,
+                'cim_value': cim_value
+            })
+    
+    return result
+
+def _distinct_strings(series):
+    """
+    Return the distinct non-null values of a Series as strings.
+    The column is dictionary-encoded first, so only its distinct values are converted.
+    """
+    values = series.dropna()
+    if values.dtype == object and pd.api.types.infer_dtype(values, skipna=False) != 'string':
+        # 1, 1.0 and True are equal as Python objects but not as strings
+        values = values.astype(str)
+    _, uniques = pd.factorize(values)
+    return pd.Series(uniques).astype(str).to_numpy(dtype=object)
+
+def compare_unique_values(gt_series, cim_series):
+    """
+    Compare the distinct values of one column in the ground truth and CIM files.
+    
+    Values are compared as strings, as before, but without building string
+    copies of whole columns or Python sets: each column's distinct values
+    are encoded against one shared dictionary and the set difference is taken
+    on the integer codes.
+    
+    Args:
+        gt_series: Column from the ground truth file
+        cim_series: Same column from the CIM update file
+        
+    Returns:
+        tuple: (gt_unique_count, cim_unique_count, removed_values) where
+            removed_values is the set of ground truth values missing from CIM
+    """
+    gt_labels = _distinct_strings(gt_series)
+    cim_labels = _distinct_strings(cim_series)
+    
+    codes, labels = pd.factorize(np.concatenate([gt_labels, cim_labels]))
+    gt_codes = np.unique(codes[:len(gt_labels)])
+    cim_codes = np.unique(codes[len(gt_labels):])
+    removed_codes = np.setdiff1d(gt_codes, cim_codes, assume_unique=True)
+    
+    return len(gt_codes), len(cim_codes), set(labels[removed_codes])
+
+def standardized_values(removed_values, cim_series, normalizer):
+    """
+    Match removed ground truth values to CIM values that differ only in
+    spelling, e.g. 'rnaSeq' -> 'RNA-seq'.
+    
+    Values match when their normalized tokens are equal. If several CIM
+    values share a token, the schema's spelling of it is preferred.
+    
+    Args:
+        removed_values (set): Ground truth values missing from CIM
+        cim_series: Same column from the CIM update file
+        normalizer: ValueNormalizer from value_normalization
+        
+    Returns:
+        dict: removed value -> CIM value it was standardized to
+    """
+    cim_values = _distinct_strings(cim_series)
+    cim_by_token = {}
+    for token, value in zip(normalizer.tokens(cim_values), cim_values):
+        cim_by_token.setdefault(token, []).append(value)
+    
+    removed = pd.Series(sorted(removed_values), dtype=object)
+    canonical_values = normalizer.canonicalize(removed, keep_unmatched=False)
+    standardized = {}
+    for value, token, canonical in zip(removed, normalizer.tokens(removed), canonical_values):
+        candidates = cim_by_token.get(token)
+        if candidates:
+            standardized[value] = canonical if canonical in candidates else candidates[0]
+    return standardized
+
+def load_file_pair(file_pair):
+    """
+    Read what compare_files needs from a (ground_truth_file, cim_update_file) pair.
+    Only the columns both files share are compared by value; the rest are
+    compared by name, so just the shared columns are loaded. Headers come
+    from each file's cache entry, or from its header line on a cache miss.
+    
+    Returns:
+        tuple: (gt_header, cim_header, gt_df, cim_df)
+    """
+    ground_truth_file, cim_update_file = file_pair
+    gt_header = cached_columns(ground_truth_file)
+    cim_header = cached_columns(cim_update_file)
+    shared_columns = set(gt_header) & set(cim_header)
+    _, gt_df = read_csv_projected(ground_truth_file, shared_columns)
+    _, cim_df = read_csv_projected(cim_update_file, shared_columns)
+    return gt_header, cim_header, gt_df, cim_df
+
+def compare_files(ground_truth_file, cim_update_file, row_diff=False, jsonld_file=None, loaded=None):
     """
     Compare a ground truth file with its CIM update counterpart.
     
     Args:
         ground_truth_file (str): Path to ground truth CSV file
         cim_update_file (str): Path to CIM update CSV file
+        row_diff (bool): Also report row- and cell-level changes (diff_rows)
+        jsonld_file (str): NF.jsonld used to look up the canonical spelling
+            of standardized values (optional)
+        loaded (Future): Prefetched result of load_file_pair for the two
+            files (see dataset_loader); None reads them here
         
     Returns:
-        dict: Comparison results
+        dict: Comparison results, including the seconds spent on the pair
     """
+    start_time = time.perf_counter()
     try:
-        # Read both files
-        gt_df = pd.read_csv(ground_truth_file)
-        cim_df = pd.read_csv(cim_update_file)
+        if loaded is None:
+            gt_header, cim_header, gt_df, cim_df = load_file_pair((ground_truth_file, cim_update_file))
+        else:
+            gt_header, cim_header, gt_df, cim_df = loaded.result()
         
         # Basic statistics
         comparison = {
             'file_name': os.path.basename(ground_truth_file),
-            'gt_columns': len(gt_df.columns),
-            'cim_columns': len(cim_df.columns),
+            'gt_columns': len(gt_header),
+            'cim_columns': len(cim_header),
             'gt_rows': len(gt_df),
             'cim_rows': len(cim_df),
             'columns_removed': [],
             'columns_kept': [],
             'data_changes': [],
             'constant_values_removed': [],
-            'na_values_cleaned': []
+            'na_values_cleaned': [],
+            'values_standardized': []
         }
         
         # Column comparison
-        gt_columns = set(gt_df.columns)
-        cim_columns = set(cim_df.columns)
+        gt_columns = set(gt_header)
+        cim_columns = set(cim_header)
         
         comparison['columns_removed'] = sorted(list(gt_columns - cim_columns))
         comparison['columns_kept'] = sorted(list(cim_columns))
         
         # For common columns, check for data standardization/cleaning
         common_columns = gt_columns & cim_columns
+        normalizer = load_normalizer(jsonld_file)
         
         for col in common_columns:
-            gt_unique = set(gt_df[col].dropna().astype(str).unique())
-            cim_unique = set(cim_df[col].dropna().astype(str).unique())
+            gt_unique_count, cim_unique_count, removed_values = compare_unique_values(gt_df[col], cim_df[col])
             
             # Check for removed constant/non-meaningful values
-            removed_values = gt_unique - cim_unique
             if removed_values:
-                # Check if these are likely constant/non-meaningful values
-                non_meaningful = {'Not Applicable', 'Unknown', 'NA', 'nan', ''}
-                if any(val in non_meaningful for val in removed_values):
+                # Placeholders such as 'Not Applicable', 'unknown' or 'NA'
+                removed = np.array(list(removed_values), dtype=object)
+                non_meaningful = set(removed[normalizer.null_mask(removed)])
+                if non_meaningful:
                     comparison['na_values_cleaned'].append({
                         'column': col,
-                        'removed_values': list(removed_values & non_meaningful)
+                        'removed_values': list(non_meaningful)
+                    })
+                
+                # Values only respelled in CIM, e.g. a casing or separator change
+                standardized = standardized_values(removed_values - non_meaningful, cim_df[col], normalizer)
+                if standardized:
+                    comparison['values_standardized'].append({
+                        'column': col,
+                        'removed_values': list(standardized),
+                        'standardized_values': list(standardized.values())
                     })
                 
                 # Check for other changes
-                other_removed = removed_values - non_meaningful
+                other_removed = removed_values - non_meaningful - set(standardized)
                 if other_removed:
                     comparison['data_changes'].append({
                         'column': col,
-                        'gt_unique_count': len(gt_unique),
-                        'cim_unique_count': len(cim_unique),
+                        'gt_unique_count': gt_unique_count,
+                        'cim_unique_count': cim_unique_count,
                         'removed_values': list(other_removed)
                     })
         
+        if row_diff:
+            comparison['row_diff'] = diff_rows(gt_df, cim_df)
+        
+        comparison['seconds'] = round(time.perf_counter() - start_time, 6)
         return comparison
         
     except Exception as e:
         return {
             'file_name': os.path.basename(ground_truth_file),
-            'error': str(e)
+            'error': str(e),
+            'seconds': round(time.perf_counter() - start_time, 6)
         }
 
 def analyze_removed_columns(all_comparisons):
@@ -121,32 +356,107 @@ def categorize_removed_columns(removed_columns):
     
     return categorized
 
-def main():
+def compare_file_pairs(file_pairs, workers=1, row_diff=False, jsonld_file=None, prefetch=DEFAULT_PREFETCH):
+    """
+    Compare (ground_truth_file, cim_update_file) pairs, optionally in parallel.
+    
+    Args:
+        file_pairs (list): List of (ground_truth_file, cim_update_file) tuples
+        workers (int): Number of worker processes; 1 compares serially
+        row_diff (bool): Also report row- and cell-level changes
+        jsonld_file (str): NF.jsonld for canonical value spellings (optional)
+        prefetch (int): In a serial run, number of pairs read ahead on
+            background threads while one is compared
+        
+    Returns:
+        list: Comparison results in the same order as file_pairs
+    """
+    if workers <= 1:
+        all_comparisons = []
+        for (gt_file, cim_file), loaded in prefetched(file_pairs, load_file_pair, prefetch):
+            print(f"Comparing {os.path.basename(gt_file)}...")
+            all_comparisons.append(compare_files(gt_file, cim_file, row_diff, jsonld_file, loaded))
+        return all_comparisons
+    
+    all_comparisons = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(compare_files, gt_file, cim_file, row_diff, jsonld_file) for gt_file, cim_file in file_pairs]
+        
+        # Collect in submission order so downstream reports are stable
+        for (gt_file, cim_file), future in zip(file_pairs, futures):
+            print(f"Comparing {os.path.basename(gt_file)}...")
+            try:
+                comparison = future.result()
+            except Exception as e:
+                comparison = {
+                    'file_name': os.path.basename(gt_file),
+                    'error': str(e)
+                }
+            all_comparisons.append(comparison)
+    
+    return all_comparisons
+
+def write_row_diff_report(all_comparisons, output_file):
+    """
+    Write the row- and cell-level changes of every comparison to a CSV file.
+    
+    Args:
+        all_comparisons (list): Comparison results made with row_diff=True
+        output_file (str): Path to the output CSV file
+        
+    Returns:
+        int: Number of change rows written
+    """
+    written = 0
+    with atomic_write(output_file, newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['File', 'Key_Column', 'Key', 'Occurrence', 'Change', 'Column', 'Ground_Truth_Value', 'CIM_Value'])
+        
+        for comp in all_comparisons:
+            if 'row_diff' not in comp:
+                continue
+            row_diff = comp['row_diff']
+            for key_value, occurrence in row_diff['rows_removed']:
+                writer.writerow([comp['file_name'], row_diff['key'], key_value, occurrence, 'Row Removed', '', '', ''])
+                written += 1
+            for key_value, occurrence in row_diff['rows_added']:
+                writer.writerow([comp['file_name'], row_diff['key'], key_value, occurrence, 'Row Added', '', '', ''])
+                written += 1
+            for cell in row_diff['modified_cells']:
+                writer.writerow([comp['file_name'], row_diff['key'], cell['key'], cell['occurrence'], 'Cell Modified',
+                                 cell['column'], cell['gt_value'], cell['cim_value']])
+                written += 1
+    
+    return written
+
+def compare_datasets(args, metrics):
+    """Compare every ground truth / CIM update pair for the parsed command line args, timing each stage on metrics."""
     # Define paths
-    base_dir = "/Users/jmoon/Documents/sandbox/neurofibromatosis-dataset-analysis"
-    ground_truth_dir = os.path.join(base_dir, "ground_truth")
+    base_dir = args.base_dir
     cim_update_dir = os.path.join(base_dir, "CIM_update")
     
     # Get all files
-    gt_files = glob.glob(os.path.join(ground_truth_dir, "nf_*.csv"))
-    gt_files.sort()
+    file_pairs, missing_files = cim_update_pairs(base_dir)
     
     print("=" * 80)
     print("COMPARING CIM_UPDATE vs GROUND_TRUTH FILES")
     print("=" * 80)
     
-    all_comparisons = []
+    for gt_file in missing_files:
+        print(f"WARNING: No corresponding CIM file for {os.path.basename(gt_file)}")
     
-    for gt_file in gt_files:
-        filename = os.path.basename(gt_file)
-        cim_file = os.path.join(cim_update_dir, f"filtered_{filename}")
-        
-        if os.path.exists(cim_file):
-            print(f"Comparing {filename}...")
-            comparison = compare_files(gt_file, cim_file)
-            all_comparisons.append(comparison)
-        else:
-            print(f"WARNING: No corresponding CIM file for {filename}")
+    jsonld_file = os.path.join(base_dir, "NF.jsonld")
+    if not os.path.exists(jsonld_file):
+        jsonld_file = None
+    
+    with metrics.stage('compare'):
+        all_comparisons = compare_file_pairs(file_pairs, workers=args.workers, row_diff=args.row_diff,
+                                             jsonld_file=jsonld_file, prefetch=args.prefetch)
+    for (gt_file, cim_file), comp in zip(file_pairs, all_comparisons):
+        rows = comp['gt_rows'] + comp['cim_rows'] if 'gt_rows' in comp else None
+        metrics.record_file('compare', gt_file, comp.get('seconds'), rows=rows,
+                            bytes_read=os.path.getsize(gt_file) + os.path.getsize(cim_file),
+                            error=comp.get('error'))
     
     # Analyze patterns
     removed_column_patterns = analyze_removed_columns(all_comparisons)
@@ -158,16 +468,37 @@ def main():
     print("=" * 80)
     
     # Create comprehensive report
-    report_content = generate_markdown_report(all_comparisons, removed_column_patterns, categorized_removals)
-    
-    # Save report
-    report_file = os.path.join(cim_update_dir, "README.md")
-    with open(report_file, 'w') as f:
-        f.write(report_content)
+    with metrics.stage('report'):
+        report_content = generate_markdown_report(all_comparisons, removed_column_patterns, categorized_removals)
+        
+        # Save report
+        report_file = os.path.join(cim_update_dir, "README.md")
+        with atomic_write(report_file) as f:
+            f.write(report_content)
     
     print(f"Report saved to: {report_file}")
+    
+    if args.row_diff:
+        row_diff_file = os.path.join(cim_update_dir, "row_level_changes.csv")
+        changes = write_row_diff_report(all_comparisons, row_diff_file)
+        print(f"Row-level changes ({changes}) saved to: {row_diff_file}")
     print(f"Total files compared: {len(all_comparisons)}")
 
+def main():
+    parser = argparse.ArgumentParser(description="Compare CIM_update files with ground_truth files.")
+    parser.add_argument('--base-dir', default="/Users/jmoon/Documents/sandbox/neurofibromatosis-dataset-analysis",
+                        help="Directory containing ground_truth and CIM_update")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes used to compare file pairs (default: 1)")
+    parser.add_argument('--row-diff', action='store_true',
+                        help="Also audit row- and cell-level changes into CIM_update/row_level_changes.csv")
+    add_prefetch_argument(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    
+    with collect_metrics('compare_cim_vs_groundtruth', args.metrics, args.cprofile) as metrics:
+        compare_datasets(args, metrics)
+
 def generate_markdown_report(all_comparisons, removed_column_patterns, categorized_removals):
     """
     Generate a comprehensive markdown report.
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Shared columnar cache for the dataset CSV files.
+
+Each CSV is parsed with pandas once and stored as a Feather file (or a pickle
+when pyarrow is not installed or the frame cannot be stored as Feather).
+Later reads load the binary copy directly and skip CSV tokenizing and type
+inference. Entries are keyed by the source path and the read_csv options,
+and are only used while the source file's mtime and size are unchanged.
+Projected reads (read_csv_projected) load just the columns they need from
+the file's full entry when one exists, and otherwise parse only those
+columns from the CSV.
+"""
+
+import os
+import glob
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from atomic_files import atomic_write
+
+try:
+    import pyarrow.ipc
+    HAVE_PYARROW = True
+except ImportError:
+    HAVE_PYARROW = False
+
+# Set NF_CSV_CACHE_DIR to keep every entry in one place; by default entries
+# are stored in a .csv_cache directory next to each source CSV
+CACHE_DIR = os.environ.get('NF_CSV_CACHE_DIR')
+
+def _read_feather(entry, columns=None):
+    """
+    Read a Feather entry, or just the listed columns of it. Feather stores
+    the gaps in object columns (e.g. True/False columns with empty cells) as
+    None, where pd.read_csv gives NaN, so they are turned back into NaN.
+    """
+    df = pd.read_feather(entry, columns=columns)
+    for col in df.columns[df.dtypes == object]:
+        missing = df[col].isna()
+        if missing.any():
+            df[col] = df[col].where(~missing, np.nan)
+    return df
+
+def _read_pickle(entry, columns=None):
+    """Read a pickle entry, or just the listed columns of it."""
+    df = pd.read_pickle(entry)
+    return df if columns is None else df[columns]
+
+def _feather_columns(entry):
+    """Return the column names stored in a Feather entry, from its schema alone."""
+    with pyarrow.ipc.open_file(entry) as reader:
+        return reader.schema.names
+
+CACHE_FORMATS = [('.feather', _read_feather), ('.pkl', _read_pickle)]
+
+def cache_dir_for(csv_file):
+    """Return the directory holding cache entries for a CSV file."""
+    if CACHE_DIR:
+        return CACHE_DIR
+    return os.path.join(os.path.dirname(os.path.abspath(csv_file)), '.csv_cache')
+
+def _cache_stem(csv_file, read_csv_kwargs):
+    """Return the part of the entry name derived from the path and read options."""
+    key = json.dumps([os.path.abspath(csv_file), read_csv_kwargs], sort_keys=True, default=repr)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def _write_entry(df, cache_dir, stem, version):
+    """Store df under stem, replacing entries for older versions of the source."""
+    os.makedirs(cache_dir, exist_ok=True)
+    
+    for stale_entry in glob.glob(os.path.join(cache_dir, f"{stem}-*")):
+        os.remove(stale_entry)
+    
+    entry = os.path.join(cache_dir, f"{stem}-{version}")
+    if HAVE_PYARROW:
+        try:
+            with atomic_write(f"{entry}.feather", 'wb') as f:
+                df.to_feather(f)
+            return
+        except Exception:
+            # Non-string or duplicate column names, custom indexes, mixed-type columns
+            pass
+    with atomic_write(f"{entry}.pkl", 'wb') as f:
+        df.to_pickle(f)
+
+def _find_entry(csv_file, cache_dir, read_csv_kwargs):
+    """
+    Locate the current cache entry for a CSV file and read options.
+    
+    Returns:
+        tuple: (stem, version, entry, extension); entry and extension are
+            None when there is no entry for the file's current version
+    """
+    if cache_dir is None:
+        cache_dir = cache_dir_for(csv_file)
+    stat = os.stat(csv_file)
+    stem = _cache_stem(csv_file, read_csv_kwargs)
+    version = f"{stat.st_mtime_ns}-{stat.st_size}"
+    
+    for extension, _ in CACHE_FORMATS:
+        entry = os.path.join(cache_dir, f"{stem}-{version}{extension}")
+        if os.path.exists(entry):
+            return stem, version, entry, extension
+    return stem, version, None, None
+
+def read_csv_cached(csv_file, cache_dir=None, columns=None, **read_csv_kwargs):
+    """
+    Read a CSV file through the columnar cache.
+    
+    Args:
+        csv_file (str): Path to the CSV file
+        cache_dir (str): Cache directory; defaults to cache_dir_for(csv_file)
+        columns (list): Load only these columns, in this order, from the
+            file's entry; None loads every column
+        **read_csv_kwargs: Options passed to pd.read_csv on a cache miss
+    
+    Returns:
+        DataFrame: The same frame pd.read_csv(csv_file, **read_csv_kwargs)
+            returns, restricted to columns if given
+    """
+    stem, version, entry, extension = _find_entry(csv_file, cache_dir, read_csv_kwargs)
+    if entry is not None:
+        try:
+            return dict(CACHE_FORMATS)[extension](entry, columns)
+        except Exception:
+            # Unreadable entry (e.g. written by another pandas version); rebuild it
+            pass
+    
+    df = pd.read_csv(csv_file, **read_csv_kwargs)
+    try:
+        _write_entry(df, cache_dir or cache_dir_for(csv_file), stem, version)
+    except OSError as e:
+        print(f"WARNING: Could not cache {csv_file}: {e}")
+    return df if columns is None else df[columns]
+
+def _entry_columns(entry, extension):
+    """Return the column names stored in a cache entry; only the schema of a Feather entry is read."""
+    if extension == '.feather':
+        return _feather_columns(entry)
+    return list(_read_pickle(entry).columns)
+
+def cached_columns(csv_file, cache_dir=None):
+    """
+    Return the column names pd.read_csv gives csv_file.
+    
+    They come from the file's cache entry when there is one (for a Feather
+    entry only the stored schema is read), and otherwise from the file's
+    header line (read_csv_header). No entry is written.
+    """
+    _, _, entry, extension = _find_entry(csv_file, cache_dir, {})
+    if entry is not None:
+        try:
+            return _entry_columns(entry, extension)
+        except Exception:
+            pass
+    return read_csv_header(csv_file)
+
+def read_csv_header(csv_file):
+    """Return the column names pd.read_csv gives csv_file, without parsing any rows."""
+    return list(pd.read_csv(csv_file, nrows=0).columns)
+
+def read_csv_projected(csv_file, columns, cache_dir=None):
+    """
+    Read only the listed columns that exist in a CSV file.
+    
+    The header is intersected with columns and only that intersection is
+    loaded. If the file already has a full cache entry, the header comes
+    from its schema and the columns are loaded from it; otherwise the header
+    line is read (read_csv_header) and the intersection is passed to
+    pd.read_csv as usecols, so a cache miss parses no other column and
+    writes no entry. At least one column is always read so the returned
+    frame still has the file's row count.
+    
+    Args:
+        csv_file (str): Path to the CSV file
+        columns: Column names wanted by the caller
+        cache_dir (str): Cache directory; defaults to cache_dir_for(csv_file)
+    
+    Returns:
+        tuple: (header, df) where header lists every column in the file and
+            df holds the wanted columns that exist, in file order
+    """
+    wanted = set(columns)
+    _, _, entry, extension = _find_entry(csv_file, cache_dir, {})
+    if entry is not None:
+        try:
+            header = _entry_columns(entry, extension)
+            usecols = [col for col in header if col in wanted] or header[:1]
+            df = dict(CACHE_FORMATS)[extension](entry, usecols)
+            return header, df[[col for col in usecols if col in wanted]]
+        except Exception:
+            # Unreadable entry; parse the CSV instead
+            pass
+    
+    header = read_csv_header(csv_file)
+    usecols = [col for col in header if col in wanted] or header[:1]
+    df = pd.read_csv(csv_file, usecols=usecols)
+    return header, df[[col for col in usecols if col in wanted]]
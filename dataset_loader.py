@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Shared discovery and prefetching of the dataset files.
+
+The analysis scripts process the ground_truth and CIM_update files one at a
+time. prefetched() loads the next few files on background threads while the
+caller works on the current one, so reads from slow (e.g. network-mounted)
+storage overlap with analysis. At most `depth` loads are in flight, so memory
+stays bounded. Results are handed back in input order, which keeps output
+deterministic, and a file that fails to load raises its error when the
+caller asks for its result, just as a direct read would.
+"""
+
+import os
+import fnmatch
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+
+# Files loaded ahead of the one being processed
+DEFAULT_PREFETCH = 4
+
+def list_csv_files(directory, pattern='*.csv'):
+    """Return the sorted paths of the files in directory whose names match pattern (none if it is missing)."""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if fnmatch.fnmatch(name, pattern))
+
+def ground_truth_files(base_dir, pattern='*.csv'):
+    """Return the sorted ground truth CSV files under base_dir."""
+    return list_csv_files(os.path.join(base_dir, 'ground_truth'), pattern)
+
+def cim_update_pairs(base_dir):
+    """
+    Pair each ground truth nf_*.csv file with its CIM_update/filtered_nf_*.csv file.
+    
+    Args:
+        base_dir (str): Directory containing ground_truth and CIM_update
+    
+    Returns:
+        tuple: (pairs, missing) where pairs lists (ground_truth_file,
+            cim_update_file) tuples and missing lists the ground truth files
+            without a CIM update, both in sorted order
+    """
+    pairs = []
+    missing = []
+    for gt_file in ground_truth_files(base_dir, 'nf_*.csv'):
+        cim_file = os.path.join(base_dir, 'CIM_update', f"filtered_{os.path.basename(gt_file)}")
+        if os.path.exists(cim_file):
+            pairs.append((gt_file, cim_file))
+        else:
+            missing.append(gt_file)
+    return pairs, missing
+
+def _completed(load, item):
+    """Run load(item) now and wrap the outcome in a finished Future."""
+    future = Future()
+    try:
+        future.set_result(load(item))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+def prefetched(items, load, depth=DEFAULT_PREFETCH):
+    """
+    Yield (item, future) for each item, in input order, where future
+    resolves to load(item).
+    
+    Up to depth items beyond the one just yielded are loaded on background
+    threads. With depth 0 each item is loaded when it is reached, on the
+    calling thread. Call future.result() to get the loaded value or raise
+    the load's exception.
+    
+    Args:
+        items: Iterable of items to load, e.g. file paths
+        load: Function called with one item
+        depth (int): Number of items loaded ahead
+    """
+    items = iter(items)
+    if depth <= 0:
+        for item in items:
+            yield item, _completed(load, item)
+        return
+    
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=depth) as executor:
+        try:
+            for item in items:
+                pending.append((item, executor.submit(load, item)))
+                if len(pending) > depth:
+                    yield pending.popleft()
+            while pending:
+                yield pending.popleft()
+        finally:
+            # The caller stopped early; drop loads that have not started
+            for _, future in pending:
+                future.cancel()
+
+def load_tables(csv_files, depth=DEFAULT_PREFETCH, **read_csv_kwargs):
+    """
+    Yield (csv_file, future) for each file, in order, where future resolves
+    to the DataFrame read_csv_cached returns for it.
+    
+    Args:
+        csv_files (list): Paths to CSV files
+        depth (int): Number of files read ahead (see prefetched)
+        **read_csv_kwargs: Options passed to read_csv_cached
+    """
+    from csv_cache import read_csv_cached
+    
+    return prefetched(csv_files, partial(read_csv_cached, **read_csv_kwargs), depth)
+
+def add_prefetch_argument(parser):
+    """Add the --prefetch option to an argparse parser."""
+    parser.add_argument('--prefetch', type=int, default=DEFAULT_PREFETCH,
+                        help=f"Number of files read ahead on background threads while one is processed "
+                             f"(default: {DEFAULT_PREFETCH}; 0 reads each file when it is needed)")
@@ -4,6 +4,9 @@ Extract columns that were found in the schema and create a separate CSV file.
 """
 
 import csv
+import argparse
+from atomic_files import atomic_write
+from run_metrics import add_metrics_arguments, collect_metrics
 
 def extract_schema_found_columns():
     """Extract columns found in schema from the flagged summary file."""
@@ -28,7 +31,7 @@ def extract_schema_found_columns():
     print(f"Found {len(found_columns)} columns that match the schema")
     
     # Write the found columns to a new CSV file
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+    with atomic_write(output_file, newline='', encoding='utf-8') as f:
         if found_columns:
             fieldnames = found_columns[0].keys()
             writer = csv.DictWriter(f, fieldnames=fieldnames)
@@ -52,6 +55,17 @@ def extract_schema_found_columns():
     
     print(f"- Computer Generated columns in schema: {computer_generated}")
     print(f"- Human Annotated columns in schema: {human_annotated}")
+    
+    return found_columns
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract the columns found in the schema into a separate CSV file.")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    
+    with collect_metrics('extract_schema_found_columns', args.metrics, args.cprofile) as metrics:
+        with metrics.stage('extract') as counts:
+            counts['columns'] = len(extract_schema_found_columns())
 
 if __name__ == "__main__":
-    extract_schema_found_columns()
+    main()
@@ -6,8 +6,23 @@ based on the CIM curated schema column list.
 
 import pandas as pd
 import os
-import glob
+import json
+import time
+import argparse
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from atomic_files import atomic_write
+from csv_cache import read_csv_header, read_csv_projected
+from run_metrics import add_metrics_arguments, collect_metrics
+from value_normalization import NULL_TOKENS, ValueNormalizer, load_normalizer
+from dataset_loader import DEFAULT_PREFETCH, add_prefetch_argument, ground_truth_files, prefetched
+
+# Fraction of rows that must hold meaningful data for a column to be kept
+MEANINGFUL_THRESHOLD = 0.25
+
+# Default rows per chunk for filter_csv_file_streaming
+STREAM_CHUNKSIZE = 100000
 
 def get_evaluatable_columns(schema_file):
     """
@@ -40,31 +55,164 @@ def get_evaluatable_columns(schema_file):
     
     return unique_evaluatable_columns
 
-def has_meaningful_data(series):
+def count_meaningful_values(df, null_tokens=NULL_TOKENS):
+    """
+    Count the meaningful values in every column of a DataFrame in one pass.
+    
+    A value is meaningful unless it is NaN, an empty string, or (in text
+    columns) a value whose normalized token (see value_normalization) is
+    empty or one of null_tokens, e.g. 'Not Applicable' or 'not_applicable'.
+    The text cells are checked in one vectorized pass (null_mask), which
+    normalizes each distinct value once.
+    
+    Args:
+        df: pandas DataFrame to check
+        null_tokens: Normalized tokens that do not count as meaningful
+        
+    Returns:
+        Series: Number of meaningful values per column
+    """
+    meaningful = df.notna() & (df != '')
+    
+    text_columns = [col for col, dtype in df.dtypes.items()
+                    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)]
+    if text_columns and null_tokens:
+        text_values = df[text_columns].to_numpy(dtype=object)
+        normalizer = load_normalizer() if null_tokens is NULL_TOKENS else ValueNormalizer(null_tokens=null_tokens)
+        null_mask = normalizer.null_mask(text_values.ravel()).reshape(text_values.shape)
+        meaningful[text_columns] &= ~null_mask
+    
+    return meaningful.sum()
+
+def select_meaningful_columns(df, null_tokens=NULL_TOKENS, threshold=MEANINGFUL_THRESHOLD):
+    """
+    Split a DataFrame's columns by whether they have enough meaningful data.
+    
+    Args:
+        df: pandas DataFrame to check
+        null_tokens: Normalized tokens that do not count as meaningful
+        threshold (float): Fraction of rows that must be meaningful
+        
+    Returns:
+        tuple: (meaningful_cols, removed_cols, meaningful_counts) where
+            meaningful_counts maps each column to its meaningful value count
+    """
+    counts = count_meaningful_values(df, null_tokens)
+    min_count = len(df) * threshold
+    
+    meaningful_cols = []
+    removed_cols = []
+    for col, count in counts.items():
+        if count >= min_count:
+            meaningful_cols.append(col)
+        else:
+            removed_cols.append(col)
+    
+    return meaningful_cols, removed_cols, {col: int(count) for col, count in counts.items()}
+
+def has_meaningful_data(series, null_tokens=NULL_TOKENS, threshold=MEANINGFUL_THRESHOLD):
     """
     Check if a column has meaningful data (not just empty, NA, or 'Not Applicable').
     
     Args:
         series: pandas Series to check
+        null_tokens: Normalized tokens that do not count as meaningful
+        threshold (float): Fraction of rows that must be meaningful
         
     Returns:
         bool: True if column has meaningful data
     """
-    # Remove NaN and empty strings
-    meaningful_values = series.dropna()
-    meaningful_values = meaningful_values[meaningful_values != '']
+    count = count_meaningful_values(series.to_frame(), null_tokens).iloc[0]
+    return count >= len(series) * threshold
+
+def write_csv_atomic(df, output_file):
+    """
+    Write a DataFrame to CSV so the output path only ever holds a complete file.
+    
+    Args:
+        df: pandas DataFrame to write
+        output_file (str): Path to output CSV file
+    """
+    with atomic_write(output_file, newline='', encoding='utf-8') as f:
+        df.to_csv(f, index=False)
+
+def find_evaluatable_columns(columns, evaluatable_columns):
+    """
+    Return the evaluatable columns present in columns, in evaluatable order, without duplicates.
+    
+    Args:
+        columns: Column names of the input file
+        evaluatable_columns (list): List of columns to keep
+        
+    Returns:
+        list: Evaluatable columns that exist in the file
+    """
+    columns = set(columns)
+    existing_evaluatable_cols = []
+    seen_cols = set()
+    for col in evaluatable_columns:
+        if col in columns and col not in seen_cols:
+            existing_evaluatable_cols.append(col)
+            seen_cols.add(col)
+    return existing_evaluatable_cols
+
+def _chunk_value_kind(series):
+    """Classify the values of one column in one chunk as 'empty', 'bool', 'int', 'float' or 'text'."""
+    if not series.notna().any():
+        return 'empty'
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return 'bool'
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return 'int'
+    if pd.api.types.is_float_dtype(series.dtype):
+        return 'float'
+    if pd.api.types.infer_dtype(series, skipna=True) == 'boolean':
+        return 'bool'
+    return 'text'
+
+def _plan_column_dtype(kinds):
+    """
+    Decide how to read a column in chunks so it is written as a whole-file read would write it.
     
-    # For string columns, also remove common non-meaningful values
-    if series.dtype == 'object':
-        meaningful_values = meaningful_values[meaningful_values.astype(str).str.lower() != 'not applicable']
-        meaningful_values = meaningful_values[meaningful_values.astype(str).str.lower() != 'na']
-        meaningful_values = meaningful_values[meaningful_values.astype(str).str.lower() != 'unknown']
+    Args:
+        kinds (set): Value kinds the column had across chunks (see _chunk_value_kind)
+        
+    Returns:
+        tuple: (read_dtype, cast_dtype); read_dtype is passed to read_csv and
+            cast_dtype is applied to each chunk, None meaning no change
+    """
+    value_kinds = kinds - {'empty'}
+    if len(kinds) == 1 or not value_kinds:
+        return None, None
+    if value_kinds <= {'int', 'float'}:
+        # Integers with missing values in other chunks become floats in a whole-file read
+        return None, 'float64'
+    if value_kinds == {'bool'}:
+        return None, object
+    # A whole-file read would keep every value of a mixed column as its raw text
+    return str, None
+
+def print_filter_result(result):
+    """
+    Print the outcome of filter_csv_file for one input file.
     
-    # Consider column meaningful if at least 25% of rows have meaningful data
-    threshold = len(series) * 0.25
-    return len(meaningful_values) >= threshold
+    Args:
+        result (dict): Result returned by filter_csv_file
+    """
+    if result['status'] == 'error':
+        print(f"  ERROR processing {result['input_file']}: {result['error']}")
+    elif result['status'] == 'no_evaluatable_columns':
+        print(f"  WARNING: No evaluatable columns found in {result['file_name']}")
+    elif result['status'] == 'no_meaningful_data':
+        print(f"  WARNING: No columns with meaningful data in {result['file_name']}")
+    else:
+        print(f"  Filtered {result['file_name']}: {result['input_columns']} -> {len(result['kept_columns'])} columns")
+        print(f"    Kept columns: {', '.join(result['kept_columns'])}")
+        if result['removed_columns']:
+            print(f"    Removed (no meaningful data): {', '.join(result['removed_columns'])}")
 
-def filter_csv_file(input_file, output_file, evaluatable_columns):
+def filter_csv_file(input_file, output_file, evaluatable_columns, verbose=True,
+                    null_tokens=NULL_TOKENS, threshold=MEANINGFUL_THRESHOLD, loaded=None):
     """
     Filter a CSV file to contain only evaluatable columns with meaningful data.
     
@@ -72,83 +220,260 @@ def filter_csv_file(input_file, output_file, evaluatable_columns):
         input_file (str): Path to input CSV file
         output_file (str): Path to output CSV file
         evaluatable_columns (list): List of columns to keep
+        verbose (bool): Print the outcome when done
+        null_tokens: Normalized tokens that do not count as meaningful
+        threshold (float): Fraction of rows that must be meaningful
+        loaded (Future): Prefetched result of read_csv_projected for
+            input_file (see dataset_loader); None reads the file here
+        
+    Returns:
+        dict: Manifest entry with the status, kept and removed columns,
+            meaningful value counts per column, and timing
     """
+    start_time = time.perf_counter()
+    result = {
+        'file_name': os.path.basename(input_file),
+        'input_file': input_file,
+        'output_file': output_file,
+        'status': 'filtered',
+        'input_columns': 0,
+        'kept_columns': [],
+        'removed_columns': []
+    }
+    
     try:
-        # Read the input CSV
-        df = pd.read_csv(input_file)
+        # Read only the evaluatable columns of the input CSV
+        if loaded is None:
+            header, df = read_csv_projected(input_file, evaluatable_columns)
+        else:
+            header, df = loaded.result()
+        result['input_columns'] = len(header)
         
         # Find which evaluatable columns exist in this file (remove duplicates)
-        existing_evaluatable_cols = []
-        seen_cols = set()
-        for col in evaluatable_columns:
-            if col in df.columns and col not in seen_cols:
-                existing_evaluatable_cols.append(col)
-                seen_cols.add(col)
+        existing_evaluatable_cols = find_evaluatable_columns(df.columns, evaluatable_columns)
         
         if not existing_evaluatable_cols:
-            print(f"  WARNING: No evaluatable columns found in {os.path.basename(input_file)}")
-            return
-        
-        # Filter the dataframe to only include evaluatable columns
-        filtered_df = df[existing_evaluatable_cols]
-        
-        # Remove columns that don't have meaningful data
-        meaningful_cols = []
-        removed_cols = []
-        
-        for col in filtered_df.columns:
-            if has_meaningful_data(filtered_df[col]):
-                meaningful_cols.append(col)
+            result['status'] = 'no_evaluatable_columns'
+        else:
+            # Filter the dataframe to only include evaluatable columns
+            filtered_df = df[existing_evaluatable_cols]
+            
+            # Remove columns that don't have meaningful data
+            kept_cols, removed_cols, meaningful_counts = select_meaningful_columns(
+                filtered_df, null_tokens, threshold)
+            result['kept_columns'] = kept_cols
+            result['removed_columns'] = removed_cols
+            result['meaningful_counts'] = meaningful_counts
+            result['rows'] = len(filtered_df)
+            
+            if not result['kept_columns']:
+                result['status'] = 'no_meaningful_data'
             else:
-                removed_cols.append(col)
+                # Keep only columns with meaningful data and save them
+                write_csv_atomic(filtered_df[result['kept_columns']], output_file)
         
-        if not meaningful_cols:
-            print(f"  WARNING: No columns with meaningful data in {os.path.basename(input_file)}")
-            return
-        
-        # Keep only columns with meaningful data
-        final_df = filtered_df[meaningful_cols]
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    
+    result['seconds'] = round(time.perf_counter() - start_time, 6)
+    if verbose:
+        print_filter_result(result)
+    return result
+
+def filter_csv_file_streaming(input_file, output_file, evaluatable_columns, chunksize=STREAM_CHUNKSIZE,
+                              verbose=True, null_tokens=NULL_TOKENS, threshold=MEANINGFUL_THRESHOLD):
+    """
+    Filter a CSV file like filter_csv_file while holding only one chunk in memory.
+    
+    The first pass reads the evaluatable columns chunk by chunk and adds up
+    their meaningful value counts. The second pass streams only the columns
+    that met the threshold to the output, reconciling each column's type
+    across chunks so values are written as a whole-file read would write them.
+    
+    Args:
+        input_file (str): Path to input CSV file
+        output_file (str): Path to output CSV file
+        evaluatable_columns (list): List of columns to keep
+        chunksize (int): Number of rows read per chunk
+        verbose (bool): Print the outcome when done
+        null_tokens: Normalized tokens that do not count as meaningful
+        threshold (float): Fraction of rows that must be meaningful
         
-        # Save the filtered data
-        final_df.to_csv(output_file, index=False)
+    Returns:
+        dict: Manifest entry in the same form as filter_csv_file
+    """
+    start_time = time.perf_counter()
+    result = {
+        'file_name': os.path.basename(input_file),
+        'input_file': input_file,
+        'output_file': output_file,
+        'status': 'filtered',
+        'input_columns': 0,
+        'kept_columns': [],
+        'removed_columns': []
+    }
+    
+    try:
+        header = read_csv_header(input_file)
+        result['input_columns'] = len(header)
+        existing_evaluatable_cols = find_evaluatable_columns(header, evaluatable_columns)
         
-        print(f"  Filtered {os.path.basename(input_file)}: {len(df.columns)} -> {len(final_df.columns)} columns")
-        print(f"    Kept columns: {', '.join(meaningful_cols)}")
-        if removed_cols:
-            print(f"    Removed (no meaningful data): {', '.join(removed_cols)}")
+        if not existing_evaluatable_cols:
+            result['status'] = 'no_evaluatable_columns'
+        else:
+            # First pass: count meaningful values per column
+            counts = pd.Series(0, index=existing_evaluatable_cols)
+            chunk_kinds = {col: set() for col in existing_evaluatable_cols}
+            rows = 0
+            for chunk in pd.read_csv(input_file, usecols=existing_evaluatable_cols, chunksize=chunksize):
+                counts = counts.add(count_meaningful_values(chunk, null_tokens), fill_value=0)
+                for col in existing_evaluatable_cols:
+                    chunk_kinds[col].add(_chunk_value_kind(chunk[col]))
+                rows += len(chunk)
+            
+            min_count = rows * threshold
+            for col in existing_evaluatable_cols:
+                if counts[col] >= min_count:
+                    result['kept_columns'].append(col)
+                else:
+                    result['removed_columns'].append(col)
+            result['meaningful_counts'] = {col: int(counts[col]) for col in existing_evaluatable_cols}
+            result['rows'] = rows
+            
+            if not result['kept_columns']:
+                result['status'] = 'no_meaningful_data'
+            else:
+                # Second pass: stream the surviving columns to the output
+                kept_cols = result['kept_columns']
+                read_dtypes = {}
+                cast_dtypes = {}
+                for col in kept_cols:
+                    read_dtype, cast_dtype = _plan_column_dtype(chunk_kinds[col])
+                    if read_dtype is not None:
+                        read_dtypes[col] = read_dtype
+                    if cast_dtype is not None:
+                        cast_dtypes[col] = cast_dtype
+                
+                with atomic_write(output_file, newline='', encoding='utf-8') as f:
+                    write_header = True
+                    for chunk in pd.read_csv(input_file, usecols=kept_cols, dtype=read_dtypes, chunksize=chunksize):
+                        chunk[kept_cols].astype(cast_dtypes).to_csv(f, index=False, header=write_header)
+                        write_header = False
+                    if write_header:
+                        pd.DataFrame(columns=kept_cols).to_csv(f, index=False)
         
     except Exception as e:
-        print(f"  ERROR processing {input_file}: {str(e)}")
+        result['status'] = 'error'
+        result['error'] = str(e)
+    
+    result['seconds'] = round(time.perf_counter() - start_time, 6)
+    if verbose:
+        print_filter_result(result)
+    return result
 
-def main():
+def _filter_one(input_file, output_file, evaluatable_columns, chunksize=None, verbose=True, loaded=None):
+    """Filter one file, streaming it in chunks when chunksize is set."""
+    if chunksize:
+        return filter_csv_file_streaming(input_file, output_file, evaluatable_columns, chunksize, verbose=verbose)
+    return filter_csv_file(input_file, output_file, evaluatable_columns, verbose=verbose, loaded=loaded)
+
+def _filter_csv_file_worker(args):
+    """Process pool entry point for filter_csv_file; output is printed by the parent."""
+    input_file, output_file, evaluatable_columns, chunksize = args
+    return _filter_one(input_file, output_file, evaluatable_columns, chunksize, verbose=False)
+
+def filter_csv_files(csv_files, output_dir, evaluatable_columns, workers=1, chunksize=None,
+                     prefetch=DEFAULT_PREFETCH):
+    """
+    Filter a batch of CSV files into output_dir, optionally in parallel.
+    output_dir is created if it does not exist.
+    
+    Args:
+        csv_files (list): Paths to input CSV files
+        output_dir (str): Directory for the filtered_<name>.csv outputs
+        evaluatable_columns (list): List of columns to keep
+        workers (int): Number of worker processes; 1 filters serially
+        chunksize (int): Stream each file in chunks of this many rows
+            (filter_csv_file_streaming); None reads each file whole
+        prefetch (int): In a serial run without chunksize, number of files
+            read ahead on background threads while one is filtered
+        
+    Returns:
+        list: Manifest entries from filter_csv_file, in the order of csv_files
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [
+        (input_file, os.path.join(output_dir, f"filtered_{os.path.basename(input_file)}"), evaluatable_columns, chunksize)
+        for input_file in csv_files
+    ]
+    
+    if workers <= 1:
+        # Streamed files are read chunk by chunk, so only whole reads are prefetched
+        if chunksize:
+            loads = [(input_file, None) for input_file in csv_files]
+        else:
+            loads = prefetched(csv_files, partial(read_csv_projected, columns=evaluatable_columns), prefetch)
+        manifest = []
+        for i, (job, (_, loaded)) in enumerate(zip(jobs, loads), 1):
+            input_file, output_file, columns, file_chunksize = job
+            print(f"[{i:2d}/{len(jobs)}] Processing {os.path.basename(input_file)}...")
+            manifest.append(_filter_one(input_file, output_file, columns, file_chunksize, loaded=loaded))
+        return manifest
+    
+    manifest = []
+    jobs_per_task = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_filter_csv_file_worker, jobs, chunksize=jobs_per_task)
+        for i, result in enumerate(results, 1):
+            print(f"[{i:2d}/{len(jobs)}] Processing {result['file_name']}...")
+            print_filter_result(result)
+            manifest.append(result)
+    return manifest
+
+def write_manifest(manifest, manifest_file):
+    """
+    Atomically write the per-file filter manifest as JSON.
+    
+    Args:
+        manifest (list): Manifest entries returned by filter_csv_files
+        manifest_file (str): Path to the manifest JSON file
+    """
+    with atomic_write(manifest_file, encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+def filter_ground_truth(args, metrics):
+    """Filter every ground truth file for the parsed command line args, timing each stage on metrics."""
     # Define paths
-    base_dir = "/Users/jmoon/Documents/sandbox/neurofibromatosis-dataset-analysis"
+    base_dir = args.base_dir
     schema_file = os.path.join(base_dir, "CIM_curated_NF_schema_column_list_7_11_25.csv")
-    ground_truth_dir = os.path.join(base_dir, "ground_truth")
     output_dir = os.path.join(base_dir, "filtered_evaluatable_data")
+    manifest_file = os.path.join(output_dir, "filter_manifest.json")
     
     # Get evaluatable columns from schema
     print("=" * 60)
     print("EXTRACTING EVALUATABLE COLUMNS FROM SCHEMA")
     print("=" * 60)
-    evaluatable_columns = get_evaluatable_columns(schema_file)
+    with metrics.stage('load_columns'):
+        evaluatable_columns = get_evaluatable_columns(schema_file)
     
     # Process all CSV files in ground_truth directory
     print("\n" + "=" * 60)
     print("FILTERING GROUND TRUTH CSV FILES")
     print("=" * 60)
     
-    csv_files = glob.glob(os.path.join(ground_truth_dir, "*.csv"))
-    csv_files.sort()
+    csv_files = ground_truth_files(base_dir)
     
     print(f"Found {len(csv_files)} CSV files to process\n")
     
-    for i, input_file in enumerate(csv_files, 1):
-        filename = os.path.basename(input_file)
-        output_file = os.path.join(output_dir, f"filtered_{filename}")
-        
-        print(f"[{i:2d}/{len(csv_files)}] Processing {filename}...")
-        filter_csv_file(input_file, output_file, evaluatable_columns)
+    with metrics.stage('filter'):
+        manifest = filter_csv_files(csv_files, output_dir, evaluatable_columns, workers=args.workers,
+                                    chunksize=args.chunksize, prefetch=args.prefetch)
+    for entry in manifest:
+        metrics.record_file('filter', entry['input_file'], entry['seconds'], rows=entry.get('rows'),
+                            status=entry['status'], error=entry.get('error'))
+    with metrics.stage('write_manifest'):
+        write_manifest(manifest, manifest_file)
     
     print("\n" + "=" * 60)
     print("SUMMARY")
@@ -156,6 +481,7 @@ def main():
     print(f"Total unique evaluatable columns: {len(evaluatable_columns)}")
     print(f"Processed files: {len(csv_files)}")
     print(f"Output directory: {output_dir}")
+    print(f"Manifest: {manifest_file}")
     
     # Show a sample of the first filtered file
     if csv_files:
@@ -180,5 +506,20 @@ def main():
             print(f"Columns with some empty values: {empty_count}/{len(sample_df.columns)}")
             print(f"Columns with 'Not Applicable' values: {na_count}/{len(sample_df.columns)}")
 
+def main():
+    parser = argparse.ArgumentParser(description="Filter ground truth CSV files to evaluatable columns.")
+    parser.add_argument('--base-dir', default="/Users/jmoon/Documents/sandbox/neurofibromatosis-dataset-analysis",
+                        help="Directory containing ground_truth and the curated schema column list")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes used to filter files (default: 1)")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="Stream each file in chunks of this many rows to bound memory use")
+    add_prefetch_argument(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    
+    with collect_metrics('filter_evaluatable_columns', args.metrics, args.cprofile) as metrics:
+        filter_ground_truth(args, metrics)
+
 if __name__ == "__main__":
     main()
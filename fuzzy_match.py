@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Trigram index for fuzzy lookup of column names among schema labels.
+
+Labels are normalized (casefolded, with separators and punctuation removed)
+and split into character trigrams once. A query only scores the labels that
+share at least one trigram with it, found through the inverted index, so
+lookups stay fast as the label set grows to tens of thousands without an
+all-pairs edit-distance scan.
+"""
+
+import re
+from collections import Counter, defaultdict
+
+def normalize_label(text):
+    """Casefold and drop everything but letters and digits: 'data_type' -> 'datatype'."""
+    return re.sub(r'[\W_]+', '', text.casefold())
+
+def trigrams(text):
+    """Return the set of character trigrams of text, padded to mark its start and end."""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TrigramIndex:
+    """Inverted index from character trigrams to labels."""
+    
+    def __init__(self, labels):
+        self.labels = sorted(set(labels))
+        self.normalized = [normalize_label(label) for label in self.labels]
+        self.sizes = []
+        self.postings = defaultdict(list)
+        for i, normalized in enumerate(self.normalized):
+            grams = trigrams(normalized)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(i)
+    
+    def search(self, query, limit=3, min_score=0.5):
+        """
+        Find the labels most similar to query.
+        
+        Similarity is the Dice coefficient of the normalized trigram sets.
+        It is 1.0 for equal normalized strings, but also for any two strings
+        with the same set of trigrams (e.g. 'abab' and 'ababab'), so among
+        equal scores a label whose normalized form equals the query's ranks
+        first.
+        
+        Args:
+            query (str): Column name to look up
+            limit (int): Maximum number of suggestions
+            min_score (float): Minimum similarity for a suggestion
+        
+        Returns:
+            list: (label, score) tuples, best first
+        """
+        normalized = normalize_label(query)
+        grams = trigrams(normalized)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        
+        scored = []
+        for i, count in shared.items():
+            score = 2 * count / (len(grams) + self.sizes[i])
+            if score >= min_score:
+                scored.append((score, self.normalized[i] != normalized, self.labels[i]))
+        scored.sort(key=lambda item: (-item[0], item[1], item[2]))
+        return [(label, round(score, 3)) for score, _, label in scored[:limit]]
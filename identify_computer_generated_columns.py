@@ -9,83 +9,199 @@ This script analyzes CSV files to identify columns that likely contain:
 Based on column names and data patterns.
 """
 
+import io
 import os
 import csv
 import re
-from collections import defaultdict
+import json
+import math
+import random
+import hashlib
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from atomic_files import atomic_write
+from run_metrics import RunMetrics, add_metrics_arguments, collect_metrics
+from dataset_loader import DEFAULT_PREFETCH, add_prefetch_argument, list_csv_files, load_tables, prefetched
+
+# Column name rules live in a data file so they can be extended without code changes
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'column_name_rules.csv')
+VERDICT_CACHE_FILE = '.column_name_verdicts.json'
+
+# Per-file classification results, keyed by file content hash and sampling options
+RESULTS_CACHE_DIR = '.classification_cache'
+# Bump when classify_csv_file changes in a way that alters its results
+RESULTS_CACHE_VERSION = 2
+
+# Compiled rules and per-name verdicts, shared by every file analyzed in this process
+_column_name_rules = None
+_column_name_verdicts = {}
 
 def get_csv_files(directory):
     """Get all CSV files from the specified directory."""
-    csv_files = []
-    for file in os.listdir(directory):
-        if file.endswith('.csv'):
-            csv_files.append(os.path.join(directory, file))
-    return sorted(csv_files)
+    return list_csv_files(directory)
+
+def load_column_name_rules(rules_file=RULES_FILE):
+    """
+    Load the column name rules from a CSV file with Pattern and Reason columns.
+    Rules are returned in file order, which is the order they are checked in.
+    """
+    with open(rules_file, 'r', newline='', encoding='utf-8') as f:
+        return [(row['Pattern'], row['Reason']) for row in csv.DictReader(f)]
+
+def compile_column_name_rules(rules):
+    """
+    Compile (pattern, reason) rules into a single regex.
+    Each pattern becomes one alternative behind a lazy '.*?' prefix, so a
+    match at the start of the name tries the rules in order and the first
+    alternative to match is the first rule re.search would have fired.
+    Returns a tuple: (matcher, reasons) where reasons maps the group index
+    of each alternative to its rule's reason.
+    """
+    alternatives = []
+    reasons = {}
+    group_index = 1
+    for pattern, reason in rules:
+        alternatives.append(f'(.*?(?:{pattern}))')
+        reasons[group_index] = reason
+        # Skip past any groups the rule's own pattern defines
+        group_index += 1 + re.compile(pattern).groups
+    return re.compile('|'.join(alternatives), re.DOTALL), reasons
+
+def _get_column_name_rules():
+    """Load and compile the column name rules once per process."""
+    global _column_name_rules
+    if _column_name_rules is None:
+        with open(RULES_FILE, 'rb') as f:
+            rules_hash = hashlib.sha256(f.read()).hexdigest()
+        matcher, reasons = compile_column_name_rules(load_column_name_rules(RULES_FILE))
+        _column_name_rules = (matcher, reasons, rules_hash)
+    return _column_name_rules
+
+def load_column_name_verdicts(cache_file=VERDICT_CACHE_FILE):
+    """Seed the verdict cache from a previous run made with the same rules file."""
+    _, _, rules_hash = _get_column_name_rules()
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return
+    
+    if cached.get('rules_hash') != rules_hash:
+        return
+    for column_name, (is_computer, reason) in cached.get('verdicts', {}).items():
+        _column_name_verdicts.setdefault(column_name, (is_computer, reason))
+
+def save_column_name_verdicts(cache_file=VERDICT_CACHE_FILE):
+    """Persist the verdict cache so later runs can skip matching known names."""
+    _, _, rules_hash = _get_column_name_rules()
+    with atomic_write(cache_file, encoding='utf-8') as f:
+        json.dump({'rules_hash': rules_hash, 'verdicts': _column_name_verdicts}, f, indent=1, sort_keys=True)
 
 def is_likely_computer_generated_column(column_name):
     """
     Identify if a column name suggests computer-generated data.
     Returns a tuple: (is_computer_generated, reason)
     """
-    column_lower = column_name.lower()
-    
-    # Definitive computer-generated patterns
-    computer_patterns = [
-        # IDs and handles
-        (r'.*id$', 'Ends with ID'),
-        (r'.*_id$', 'Ends with _ID'),
-        (r'.*key$', 'Ends with Key'),
-        (r'.*_key$', 'Ends with _Key'),
-        (r'handle', 'Contains handle'),
-        (r'uuid', 'Contains UUID'),
-        (r'guid', 'Contains GUID'),
-        
-        # Hashes and checksums
-        (r'.*hash.*', 'Contains hash'),
-        (r'.*md5.*', 'Contains MD5'),
-        (r'.*checksum.*', 'Contains checksum'),
-        (r'.*etag.*', 'Contains etag'),
-        
-        # System metadata
-        (r'created.*', 'Creation metadata'),
-        (r'modified.*', 'Modification metadata'),
-        (r'.*by$', 'Created/Modified by field'),
-        (r'.*on$', 'Created/Modified on field'),
-        (r'version', 'Version field'),
-        (r'.*size.*', 'File size field'),
-        (r'.*bucket.*', 'Storage bucket field'),
-        (r'.*path.*', 'File path field'),
-        
-        # Technical identifiers
-        (r'benefactor.*', 'System benefactor'),
-        (r'parent.*id.*', 'Parent ID reference'),
-        (r'project.*id.*', 'Project ID reference'),
-        (r'entity.*id.*', 'Entity ID reference'),
-        (r'resource.*id.*', 'Resource ID reference'),
-        (r'component', 'Component identifier'),
-        (r'alias', 'System alias'),
-        (r'view.*id.*', 'View ID reference'),
-        (r'concrete.*type.*', 'Concrete type field'),
-        
-        # File metadata
-        (r'filename', 'Filename field'),
-        (r'.*format$', 'File format field'),
-        (r'.*type$', 'Type field (often system-generated)'),
-        (r'.*bytes.*', 'Byte size field'),
-        (r'.*length.*', 'Length field'),
-        (r'url', 'URL field'),
-        (r'.*milestone.*', 'Milestone field'),
-        
-        # Timestamps and technical values
-        (r'.*\d{4,}.*', 'Contains long numbers (likely timestamps)'),
-        (r'.*current.*', 'Current state field'),
-    ]
+    verdict = _column_name_verdicts.get(column_name)
+    if verdict is None:
+        matcher, reasons, _ = _get_column_name_rules()
+        match = matcher.match(column_name.lower())
+        if match:
+            verdict = (True, reasons[match.lastindex])
+        else:
+            verdict = (False, "Likely human-annotated")
+        _column_name_verdicts[column_name] = verdict
+    
+    return verdict
+
+def value_pattern(column_name, value):
+    """
+    Return the description of the computer-generated pattern a single value
+    matches, or None if it matches none.
+    """
+    # UUID pattern
+    if re.match(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', value.lower()):
+        return "UUID format"
+    
+    # Hash-like (long hex strings)
+    if re.match(r'^[0-9a-f]{16,}$', value.lower()):
+        return "Hash-like hex string"
+    
+    # Synapse ID pattern
+    if re.match(r'^syn\d+$', value):
+        return "Synapse ID format"
+    
+    # Long numeric IDs
+    if re.match(r'^\d{10,}$', value):
+        return "Long numeric ID"
+    
+    # File handle ID pattern
+    if re.match(r'^\d{6,}$', value) and 'handle' in column_name.lower():
+        return "File handle ID"
+    
+    # URL pattern
+    if value.startswith(('http://', 'https://', 'ftp://')):
+        return "URL format"
+    
+    # File path pattern
+    if '/' in value and ('.' in value or 'syn' in value):
+        return "File path format"
+    
+    return None
+
+def _consistent_alphanumeric(sample_values):
+    """Return True if all values share one length over 10 and mix digits and letters."""
+    if len(set(len(v) for v in sample_values)) == 1 and len(sample_values[0]) > 10:
+        return all(any(c.isdigit() for c in v) and any(c.isalpha() for c in v) for v in sample_values)
+    return False
+
+def classify_sample_values(column_name, sample_values):
+    """
+    Check sample data values for computer-generated patterns.
+    The per-value patterns are checked on the first value only.
+    Returns a tuple: (is_computer_generated, sample_values, pattern_description)
+    """
+    if not sample_values:
+        return False, [], "No data available"
+    
+    # Check patterns in the data
+    pattern = value_pattern(column_name, sample_values[0])
+    if pattern is not None:
+        return True, sample_values, pattern
+    
+    # Check if all values are similar format (suggesting system generation)
+    if _consistent_alphanumeric(sample_values):
+        return True, sample_values, "Consistent alphanumeric format"
+    
+    return False, sample_values, "Human-readable format"
+
+def vote_sample_values(column_name, sample_values):
+    """
+    Check sample data values for computer-generated patterns by majority vote.
+    Unlike classify_sample_values, every value is checked, and a pattern
+    decides the column only if more than half of the values match it.
+    Returns a tuple: (is_computer_generated, sample_values, pattern_description)
+    """
+    if not sample_values:
+        return False, [], "No data available"
+    
+    votes = {}
+    for value in sample_values:
+        pattern = value_pattern(column_name, value)
+        if pattern is not None:
+            votes[pattern] = votes.get(pattern, 0) + 1
     
-    for pattern, reason in computer_patterns:
-        if re.search(pattern, column_lower):
-            return True, reason
+    if votes:
+        pattern = max(votes, key=votes.get)
+        if votes[pattern] * 2 > len(sample_values):
+            return True, sample_values, pattern
     
-    return False, "Likely human-annotated"
+    if _consistent_alphanumeric(sample_values):
+        return True, sample_values, "Consistent alphanumeric format"
+    
+    return False, sample_values, "Human-readable format"
 
 def analyze_sample_data(file_path, column_name, max_samples=5):
     """
@@ -105,52 +221,507 @@ def analyze_sample_data(file_path, column_name, max_samples=5):
                 if value and value != 'NA':
                     sample_values.append(value)
             
-            if not sample_values:
-                return False, [], "No data available"
-            
-            # Check patterns in the data
-            first_value = sample_values[0]
-            
-            # UUID pattern
-            if re.match(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', first_value.lower()):
-                return True, sample_values, "UUID format"
-            
-            # Hash-like (long hex strings)
-            if re.match(r'^[0-9a-f]{16,}$', first_value.lower()):
-                return True, sample_values, "Hash-like hex string"
-            
-            # Synapse ID pattern
-            if re.match(r'^syn\d+$', first_value):
-                return True, sample_values, "Synapse ID format"
-            
-            # Long numeric IDs
-            if re.match(r'^\d{10,}$', first_value):
-                return True, sample_values, "Long numeric ID"
-            
-            # File handle ID pattern
-            if re.match(r'^\d{6,}$', first_value) and 'handle' in column_name.lower():
-                return True, sample_values, "File handle ID"
-            
-            # URL pattern
-            if first_value.startswith(('http://', 'https://', 'ftp://')):
-                return True, sample_values, "URL format"
-            
-            # File path pattern
-            if '/' in first_value and ('.' in first_value or 'syn' in first_value):
-                return True, sample_values, "File path format"
-            
-            # Check if all values are similar format (suggesting system generation)
-            if len(set(len(v) for v in sample_values)) == 1 and len(first_value) > 10:
-                if all(any(c.isdigit() for c in v) and any(c.isalpha() for c in v) for v in sample_values):
-                    return True, sample_values, "Consistent alphanumeric format"
-            
-            return False, sample_values, "Human-readable format"
+            return classify_sample_values(column_name, sample_values)
             
     except Exception as e:
         return False, [], f"Error reading data: {e}"
 
-def analyze_csv_files(directory):
-    """Analyze all CSV files to identify computer-generated vs human-annotated columns."""
+# Bytes read ahead of classification per file: enough for the first rows
+# in head mode, and a bounded prefix of the scanned range when sampling
+HEAD_READ_AHEAD_BYTES = 64 * 1024
+SAMPLE_READ_AHEAD_BYTES = 16 * 1024 * 1024
+
+class _ReadAhead(io.RawIOBase):
+    """
+    Binary stream over a file whose leading bytes were already read into
+    memory by read_ahead_csv_file. Reads are served from those bytes first; the file
+    is only opened again if the caller reads past them.
+    """
+    
+    def __init__(self, file_path, data, complete):
+        super().__init__()
+        self.file_path = file_path
+        self.data = data
+        self.complete = complete
+        self.position = 0
+        self.rest = None
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        buffer = memoryview(buffer).cast('B')
+        n = 0
+        if self.position < len(self.data):
+            n = min(len(buffer), len(self.data) - self.position)
+            buffer[:n] = self.data[self.position:self.position + n]
+        # Fill the rest of the buffer from the file, as a plain read would
+        if n < len(buffer) and not self.complete:
+            if self.rest is None:
+                self.rest = open(self.file_path, 'rb', buffering=0)
+                self.rest.seek(len(self.data))
+            n += self.rest.readinto(buffer[n:]) or 0
+        self.position += n
+        return n
+    
+    def tell(self):
+        return self.position
+    
+    def close(self):
+        if self.rest is not None:
+            self.rest.close()
+        super().close()
+
+def read_ahead_csv_file(file_path, sampling=None):
+    """
+    Read the leading bytes of a CSV file that classify_csv_file will need,
+    so the read can run on a background thread ahead of classification.
+    Returns a _ReadAhead to pass to classify_csv_file as read_ahead.
+    """
+    if sampling is None:
+        limit = HEAD_READ_AHEAD_BYTES
+    else:
+        limit = min(sampling.get('byte_budget') or SAMPLE_READ_AHEAD_BYTES, SAMPLE_READ_AHEAD_BYTES)
+    with open(file_path, 'rb') as f:
+        data = f.read(limit)
+    return _ReadAhead(file_path, data, len(data) < limit)
+
+def _open_binary(file_path, read_ahead=None):
+    """Open file_path for binary reading, through read_ahead's bytes if given."""
+    if read_ahead is None:
+        return open(file_path, 'rb')
+    return io.BufferedReader(read_ahead)
+
+def profile_csv_file(file_path, max_samples=5, stats=None, read_ahead=None):
+    """
+    Read a CSV file once and check sample data for every column in that pass.
+    Returns a tuple: (headers, profiles) where profiles maps each column name
+    to the (is_computer_generated, sample_values, pattern_description) tuple
+    that analyze_sample_data would return for it.
+    If stats is a dict, the data rows sampled and bytes read are stored in it.
+    If read_ahead is given (see read_ahead_csv_file), the file is read through it.
+    """
+    with io.TextIOWrapper(_open_binary(file_path, read_ahead), encoding='utf-8') as f:
+        reader = csv.reader(f)
+        headers = next(reader)
+        
+        # Like DictReader, a repeated header takes the value of its last occurrence
+        column_index = {column: i for i, column in enumerate(headers)}
+        samples = {column: [] for column in column_index}
+        
+        rows_read = 0
+        for row in reader:
+            if rows_read >= max_samples:
+                break
+            # DictReader skips blank lines without counting them
+            if not row:
+                continue
+            rows_read += 1
+            for column, index in column_index.items():
+                value = row[index].strip() if index < len(row) else ''
+                if value and value != 'NA':
+                    samples[column].append(value)
+        
+        if stats is not None:
+            stats['rows'] = rows_read
+            stats['bytes_read'] = f.buffer.tell()
+    
+    profiles = {column: classify_sample_values(column, values) for column, values in samples.items()}
+    return headers, profiles
+
+class _BudgetedLines:
+    """
+    Decoded lines of a binary file, ending once byte_budget bytes have been read.
+    
+    csv.reader returns a record as soon as its last line is read, and only
+    asks for another line first when the record continues (a quoted field
+    spanning lines). So a row it returns after the budget ended the lines
+    (cut_off) is a record the budget cut off, not a complete one.
+    """
+    
+    def __init__(self, f, byte_budget=None):
+        self.f = f
+        self.byte_budget = byte_budget
+        self.cut_off = False
+    
+    def __iter__(self):
+        bytes_read = 0
+        for line in self.f:
+            yield line.decode('utf-8')
+            bytes_read += len(line)
+            if self.byte_budget is not None and bytes_read >= self.byte_budget:
+                self.cut_off = True
+                return
+
+def _open_random(rng):
+    """Return a uniform random number in the open interval (0, 1)."""
+    u = rng.random()
+    while u == 0.0:
+        u = rng.random()
+    return u
+
+class _Reservoir:
+    """
+    Uniform sample of up to size values from a stream of unknown length
+    (Algorithm L). Between replacements only a counter is advanced, so the
+    per-value cost is a single comparison.
+    """
+    
+    def __init__(self, size, rng):
+        self.size = size
+        self.rng = rng
+        self.items = []
+        self.seen = 0
+        self.weight = math.exp(math.log(_open_random(rng)) / size)
+        self.next_replacement = size + self._skip()
+    
+    def _skip(self):
+        """Return how many values to pass over until the next replacement."""
+        return int(math.floor(math.log(_open_random(self.rng)) / math.log(1 - self.weight))) + 1
+    
+    def add(self, item):
+        """Offer one item to the sample."""
+        self.seen += 1
+        if self.seen <= self.size:
+            self.items.append(item)
+        elif self.seen == self.next_replacement:
+            self.items[self.rng.randrange(self.size)] = item
+            self.weight *= math.exp(math.log(_open_random(self.rng)) / self.size)
+            self.next_replacement += self._skip()
+
+def sample_csv_file(file_path, max_samples=5, row_budget=None, byte_budget=None, seed=0, stats=None,
+                    read_ahead=None):
+    """
+    Read a CSV file once and reservoir-sample every column in that pass.
+    
+    Unlike profile_csv_file, which only looks at the first max_samples rows,
+    each column keeps a uniform random sample of its non-empty, non-NA values
+    from the whole scanned range, so a column whose first rows are NA is still
+    judged on real values, and the verdict is a majority vote over the whole
+    sample (vote_sample_values). Memory stays at max_samples values per
+    column, and the scan stops early once row_budget data rows or byte_budget
+    bytes have been read; a record the byte budget cuts off is dropped.
+    Sampling is seeded per file, so results are reproducible.
+    
+    Args:
+        file_path (str): Path to the CSV file
+        max_samples (int): Values kept per column
+        row_budget (int): Stop after this many data rows (None scans all)
+        byte_budget (int): Stop after this many bytes (None scans all)
+        seed (int): Random seed for the reservoirs
+        stats (dict): If given, receives the data rows scanned ('rows') and
+            bytes read ('bytes_read')
+        read_ahead (_ReadAhead): Leading bytes already read by read_ahead_csv_file
+    
+    Returns:
+        tuple: (headers, profiles) in the same form as profile_csv_file, with
+            each column's samples in file order
+    """
+    rng = random.Random(seed)
+    with _open_binary(file_path, read_ahead) as f:
+        lines = _BudgetedLines(f, byte_budget)
+        reader = csv.reader(lines)
+        headers = next(reader)
+        
+        # Like DictReader, a repeated header takes the value of its last occurrence
+        column_index = {column: i for i, column in enumerate(headers)}
+        reservoirs = {column: _Reservoir(max_samples, rng) for column in column_index}
+        
+        rows_read = 0
+        for row in reader:
+            if row_budget is not None and rows_read >= row_budget:
+                break
+            if lines.cut_off:
+                break
+            if not row:
+                continue
+            rows_read += 1
+            for column, index in column_index.items():
+                value = row[index].strip() if index < len(row) else ''
+                if value and value != 'NA':
+                    reservoirs[column].add((rows_read, value))
+        
+        if stats is not None:
+            stats['rows'] = rows_read
+            stats['bytes_read'] = f.tell()
+    
+    profiles = {}
+    for column, reservoir in reservoirs.items():
+        values = [value for _, value in sorted(reservoir.items)]
+        profiles[column] = vote_sample_values(column, values)
+    return headers, profiles
+
+def classify_csv_file(file_path, sampling=None, stats=None, read_ahead=None):
+    """
+    Classify every column of a single CSV file.
+    Sample data comes from the first rows (profile_csv_file), or, when
+    sampling is a dict of sample_csv_file options, from a reservoir sample.
+    If stats is a dict, the rows sampled and bytes read are stored in it.
+    read_ahead holds the file's leading bytes if read_ahead_csv_file already read them.
+    Returns a dict mapping each category to its list of column results.
+    """
+    if sampling is None:
+        headers, profiles = profile_csv_file(file_path, stats=stats, read_ahead=read_ahead)
+    else:
+        headers, profiles = sample_csv_file(file_path, stats=stats, read_ahead=read_ahead, **sampling)
+    
+    file_results = {
+        'computer_generated': [],
+        'likely_human': [],
+        'uncertain': []
+    }
+    
+    for column in headers:
+        # Check column name patterns
+        is_computer_by_name, name_reason = is_likely_computer_generated_column(column)
+        
+        # Check sample data patterns
+        is_computer_by_data, sample_values, data_reason = profiles[column]
+        
+        # Make final determination
+        if is_computer_by_name or is_computer_by_data:
+            category = 'computer_generated'
+            reason = name_reason if is_computer_by_name else data_reason
+        else:
+            category = 'likely_human'
+            reason = "No computer-generated patterns detected"
+        
+        file_results[category].append({
+            'column': column,
+            'reason': reason,
+            'sample_values': sample_values[:3],  # First 3 samples
+            'name_check': name_reason,
+            'data_check': data_reason
+        })
+    
+    return file_results
+
+def _classify_csv_file_worker(file_path, sampling=None):
+    """
+    Process pool entry point for classify_csv_file.
+    Returns a tuple: (file_results, error, name_verdicts, seconds, stats)
+    where name_verdicts holds the column name verdicts this file used, for
+    the parent's cache, seconds is the time spent classifying the file and
+    stats holds the rows sampled and bytes read.
+    """
+    start_time = time.perf_counter()
+    stats = {}
+    try:
+        file_results = classify_csv_file(file_path, sampling, stats)
+    except Exception as e:
+        return None, e, {}, time.perf_counter() - start_time, stats
+    seconds = time.perf_counter() - start_time
+    
+    name_verdicts = {}
+    for items in file_results.values():
+        for item in items:
+            name_verdicts[item['column']] = _column_name_verdicts[item['column']]
+    return file_results, None, name_verdicts, seconds, stats
+
+def _classify_csv_files(csv_files, workers, sampling=None, prefetch=DEFAULT_PREFETCH):
+    """
+    Yield (file_path, file_results, error, seconds, stats) for each file, in
+    input order, where stats holds the rows sampled and bytes read.
+    With more than one worker the files are classified in a process pool;
+    otherwise they are classified on this thread while the leading bytes of
+    the next prefetch files are read on background threads (read_ahead_csv_file).
+    """
+    if workers <= 1:
+        if prefetch > 0:
+            loads = prefetched(csv_files, partial(read_ahead_csv_file, sampling=sampling), prefetch)
+        else:
+            loads = ((file_path, None) for file_path in csv_files)
+        for file_path, future in loads:
+            start_time = time.perf_counter()
+            stats = {}
+            try:
+                file_results = classify_csv_file(file_path, sampling, stats,
+                                                 future.result() if future is not None else None)
+            except Exception as e:
+                yield file_path, None, e, time.perf_counter() - start_time, {}
+                continue
+            yield file_path, file_results, None, time.perf_counter() - start_time, stats
+        return
+    
+    chunksize = max(1, len(csv_files) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_column_name_verdicts) as executor:
+        results = executor.map(_classify_csv_file_worker, csv_files, [sampling] * len(csv_files), chunksize=chunksize)
+        for file_path, (file_results, error, name_verdicts, seconds, stats) in zip(csv_files, results):
+            _column_name_verdicts.update(name_verdicts)
+            yield file_path, file_results, error, seconds, stats
+
+def file_content_hash(file_path):
+    """Return the SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _load_results_index(cache_dir):
+    """Load the path -> [mtime_ns, size, content_hash] index of hashed files."""
+    try:
+        with open(os.path.join(cache_dir, 'index.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_results_index(cache_dir, index):
+    """Save the hashed-file index, replacing the previous one in a single step."""
+    os.makedirs(cache_dir, exist_ok=True)
+    index_file = os.path.join(cache_dir, 'index.json')
+    with atomic_write(index_file, encoding='utf-8') as f:
+        json.dump(index, f)
+
+def _indexed_content_hash(file_path, index):
+    """Return a file's content hash, only rehashing it if its mtime or size changed."""
+    stat = os.stat(file_path)
+    key = os.path.abspath(file_path)
+    entry = index.get(key)
+    if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+        return entry[2]
+    
+    content_hash = file_content_hash(file_path)
+    index[key] = [stat.st_mtime_ns, stat.st_size, content_hash]
+    return content_hash
+
+def _sampling_key(sampling):
+    """Return a short hash of the sampling options (None for head sampling)."""
+    return hashlib.sha1(json.dumps(sampling, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+
+def _results_entry_name(content_hash, sampling=None):
+    """Return the cache entry name for a file's content hash and sampling options."""
+    return f"{content_hash}-{_sampling_key(sampling)}.json"
+
+# Cache entry names: content hash and sampling key
+_RESULTS_ENTRY_NAME = re.compile(r'^([0-9a-f]{64})-[0-9a-f]{8}\.json$')
+
+def load_cached_results(cache_dir, content_hash, sampling=None):
+    """
+    Load cached classification results for a file's content hash.
+    Each sampling mode and set of options has its own entry.
+    Returns None if there is no entry or it was made with other rules, code
+    or sampling options.
+    """
+    try:
+        with open(os.path.join(cache_dir, _results_entry_name(content_hash, sampling)), 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    _, _, rules_hash = _get_column_name_rules()
+    if entry.get('version') != RESULTS_CACHE_VERSION or entry.get('rules_hash') != rules_hash:
+        return None
+    if entry.get('sampling') != sampling:
+        return None
+    return entry['file_results']
+
+def save_cached_results(cache_dir, content_hash, file_results, sampling=None):
+    """Persist classification results for a file's content hash and sampling options."""
+    os.makedirs(cache_dir, exist_ok=True)
+    _, _, rules_hash = _get_column_name_rules()
+    entry_file = os.path.join(cache_dir, _results_entry_name(content_hash, sampling))
+    with atomic_write(entry_file, encoding='utf-8') as f:
+        json.dump({'version': RESULTS_CACHE_VERSION, 'rules_hash': rules_hash, 'sampling': sampling,
+                   'file_results': file_results}, f)
+
+def prune_results_cache(cache_dir, index, csv_files, content_hashes):
+    """
+    Drop the cache entries and index rows the current files no longer use:
+    entries for old contents of changed files or for deleted files, and
+    index rows for paths that are not among csv_files. Entries of current
+    contents are kept for every sampling mode.
+    Returns the number of entries removed.
+    """
+    current_paths = {os.path.abspath(file_path) for file_path in csv_files}
+    for path in [path for path in index if path not in current_paths]:
+        del index[path]
+    
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return 0
+    
+    removed = 0
+    current_hashes = set(content_hashes.values())
+    for name in names:
+        if not name.endswith('.json') or name == 'index.json':
+            continue
+        match = _RESULTS_ENTRY_NAME.match(name)
+        if match is None or match.group(1) not in current_hashes:
+            os.remove(os.path.join(cache_dir, name))
+            removed += 1
+    return removed
+
+def _classify_csv_files_cached(csv_files, workers, sampling=None, cache_dir=RESULTS_CACHE_DIR,
+                               prefetch=DEFAULT_PREFETCH):
+    """
+    Yield (file_path, file_results, error, seconds, stats) for each file, in input order.
+    Files whose content was classified before reuse the cached results
+    (seconds is None and nothing is read for them); only new or changed
+    files are classified.
+    Entries no longer used by csv_files are pruned at the end.
+    """
+    index = _load_results_index(cache_dir)
+    content_hashes = {}
+    cached_results = {}
+    
+    for file_path in csv_files:
+        try:
+            content_hashes[file_path] = _indexed_content_hash(file_path, index)
+        except OSError:
+            # Leave it to classification to report the unreadable file
+            continue
+        file_results = load_cached_results(cache_dir, content_hashes[file_path], sampling)
+        if file_results is not None:
+            cached_results[file_path] = file_results
+    
+    print(f"Reusing cached results for {len(cached_results)} of {len(csv_files)} files")
+    
+    fresh_results = _classify_csv_files([f for f in csv_files if f not in cached_results], workers, sampling,
+                                        prefetch)
+    for file_path in csv_files:
+        if file_path in cached_results:
+            yield file_path, cached_results[file_path], None, None, {'rows': 0, 'bytes_read': 0}
+            continue
+        
+        file_path, file_results, error, seconds, stats = next(fresh_results)
+        if error is None and file_path in content_hashes:
+            save_cached_results(cache_dir, content_hashes[file_path], file_results, sampling)
+        yield file_path, file_results, error, seconds, stats
+    
+    removed = prune_results_cache(cache_dir, index, csv_files, content_hashes)
+    if removed:
+        print(f"Removed {removed} stale cached results")
+    _save_results_index(cache_dir, index)
+
+def build_column_index(all_results):
+    """
+    Invert per-file results into category -> column -> files.
+    A file is listed once per occurrence of the column (repeated headers
+    occur more than once), so the length of each list is the column's
+    frequency. Columns appear in the order they are first seen.
+    """
+    column_index = {}
+    for filename, results in all_results.items():
+        for category, items in results.items():
+            files_by_column = column_index.setdefault(category, {})
+            for item in items:
+                files_by_column.setdefault(item['column'], []).append(filename)
+    return column_index
+
+def example_files(files, limit=3):
+    """Return up to limit distinct files from a column's file list, in order."""
+    return list(dict.fromkeys(files))[:limit]
+
+def analyze_csv_files(directory, workers=1, use_cache=True, metrics=None, sampling=None, prefetch=DEFAULT_PREFETCH):
+    """
+    Analyze all CSV files to identify computer-generated vs human-annotated columns.
+    With use_cache, only files whose content changed since the last run are classified.
+    sampling is None (sample the first rows) or a dict of sample_csv_file options.
+    In a serial run, prefetch files are read ahead on background threads.
+    Stage and per-file timings are recorded on metrics (a RunMetrics) if given.
+    """
     print(f"Analyzing CSV files for computer-generated vs human-annotated columns...")
     print("=" * 80)
     
@@ -160,50 +731,29 @@ def analyze_csv_files(directory):
         print("No CSV files found in the directory.")
         return
     
+    if metrics is None:
+        metrics = RunMetrics('analyze_csv_files')
+    
     all_results = {}
+    load_column_name_verdicts()
+    classify_start = time.perf_counter()
     
-    for file_path in csv_files:
+    if use_cache:
+        classified_files = _classify_csv_files_cached(csv_files, workers, sampling, prefetch=prefetch)
+    else:
+        classified_files = _classify_csv_files(csv_files, workers, sampling, prefetch)
+    
+    for file_path, file_results, error, seconds, stats in classified_files:
         filename = os.path.basename(file_path)
         print(f"\nAnalyzing: {filename}")
         print("-" * 50)
+        metrics.record_file('classify', file_path, seconds, rows=stats.get('rows'), bytes_read=stats.get('bytes_read'),
+                            cached=seconds is None, error=str(error) if error else None)
         
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                headers = next(reader)
-        except Exception as e:
-            print(f"Error reading {filename}: {e}")
+        if error is not None:
+            print(f"Error reading {filename}: {error}")
             continue
         
-        file_results = {
-            'computer_generated': [],
-            'likely_human': [],
-            'uncertain': []
-        }
-        
-        for column in headers:
-            # Check column name patterns
-            is_computer_by_name, name_reason = is_likely_computer_generated_column(column)
-            
-            # Check sample data patterns
-            is_computer_by_data, sample_values, data_reason = analyze_sample_data(file_path, column)
-            
-            # Make final determination
-            if is_computer_by_name or is_computer_by_data:
-                category = 'computer_generated'
-                reason = name_reason if is_computer_by_name else data_reason
-            else:
-                category = 'likely_human'
-                reason = "No computer-generated patterns detected"
-            
-            file_results[category].append({
-                'column': column,
-                'reason': reason,
-                'sample_values': sample_values[:3],  # First 3 samples
-                'name_check': name_reason,
-                'data_check': data_reason
-            })
-        
         all_results[filename] = file_results
         
         # Print results for this file
@@ -217,32 +767,25 @@ def analyze_csv_files(directory):
             sample_str = f" | Samples: {', '.join(item['sample_values'])}" if item['sample_values'] else ""
             print(f"  • {item['column']}: {item['reason']}{sample_str}")
     
+    save_column_name_verdicts()
+    metrics.add_stage('classify', time.perf_counter() - classify_start)
+    summary_start = time.perf_counter()
+    
     # Create summary analysis
     print(f"\n\nSUMMARY ANALYSIS:")
     print("=" * 80)
     
-    # Count columns across all files
-    all_computer_columns = set()
-    all_human_columns = set()
+    # Index columns across all files once; every summary below reads from it
+    column_index = build_column_index(all_results)
+    computer_column_files = column_index.get('computer_generated', {})
+    human_column_files = column_index.get('likely_human', {})
     
-    for filename, results in all_results.items():
-        for item in results['computer_generated']:
-            all_computer_columns.add(item['column'])
-        for item in results['likely_human']:
-            all_human_columns.add(item['column'])
-    
-    print(f"Total unique computer-generated columns: {len(all_computer_columns)}")
-    print(f"Total unique human-annotated columns: {len(all_human_columns)}")
+    print(f"Total unique computer-generated columns: {len(computer_column_files)}")
+    print(f"Total unique human-annotated columns: {len(human_column_files)}")
     
     # Find most common computer-generated columns
-    computer_column_counts = defaultdict(int)
-    human_column_counts = defaultdict(int)
-    
-    for filename, results in all_results.items():
-        for item in results['computer_generated']:
-            computer_column_counts[item['column']] += 1
-        for item in results['likely_human']:
-            human_column_counts[item['column']] += 1
+    computer_column_counts = {col: len(files) for col, files in computer_column_files.items()}
+    human_column_counts = {col: len(files) for col, files in human_column_files.items()}
     
     print(f"\nMost common computer-generated columns:")
     for col, count in sorted(computer_column_counts.items(), key=lambda x: x[1], reverse=True)[:15]:
@@ -257,7 +800,7 @@ def analyze_csv_files(directory):
     print("-" * 30)
     
     # Save per-file analysis
-    with open('computer_vs_human_columns_detailed.csv', 'w', newline='', encoding='utf-8') as f:
+    with atomic_write('computer_vs_human_columns_detailed.csv', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         writer.writerow(['File', 'Column', 'Category', 'Reason', 'Sample_Values', 'Name_Check', 'Data_Check'])
         
@@ -277,38 +820,77 @@ def analyze_csv_files(directory):
     print("Detailed analysis saved to: computer_vs_human_columns_detailed.csv")
     
     # Save summary by column
-    with open('column_classification_summary.csv', 'w', newline='', encoding='utf-8') as f:
+    with atomic_write('column_classification_summary.csv', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
         writer.writerow(['Column', 'Classification', 'Frequency', 'Example_Files'])
         
         # Computer-generated columns
         for col, count in sorted(computer_column_counts.items(), key=lambda x: x[1], reverse=True):
-            example_files = []
-            for filename, results in all_results.items():
-                if any(item['column'] == col for item in results['computer_generated']):
-                    example_files.append(filename)
-                    if len(example_files) >= 3:
-                        break
-            
-            writer.writerow([col, 'Computer Generated', count, ', '.join(example_files)])
+            writer.writerow([col, 'Computer Generated', count, ', '.join(example_files(computer_column_files[col]))])
         
         # Human-annotated columns
         for col, count in sorted(human_column_counts.items(), key=lambda x: x[1], reverse=True):
-            example_files = []
-            for filename, results in all_results.items():
-                if any(item['column'] == col for item in results['likely_human']):
-                    example_files.append(filename)
-                    if len(example_files) >= 3:
-                        break
-            
-            writer.writerow([col, 'Human Annotated', count, ', '.join(example_files)])
+            writer.writerow([col, 'Human Annotated', count, ', '.join(example_files(human_column_files[col]))])
     
     print("Column classification summary saved to: column_classification_summary.csv")
+    metrics.add_stage('summary', time.perf_counter() - summary_start, columns=len(computer_column_counts) + len(human_column_counts))
     
     return all_results
 
+def write_value_pattern_scores(csv_files, output_file='column_value_pattern_scores.csv', prefetch=DEFAULT_PREFETCH):
+    """
+    Score every value of every column against the computer-generated value
+    patterns and save the fraction of matching values per pattern.
+    The next prefetch files are read while one is scored.
+    Needs pandas, unlike the sampled classification.
+    """
+    from value_patterns import PATTERN_NAMES, score_dataframe
+    
+    with atomic_write(output_file, newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['File', 'Column', 'Values'] + PATTERN_NAMES + ['Top_Pattern', 'Top_Score'])
+        
+        for file_path, table in load_tables(csv_files, prefetch, dtype=str, keep_default_na=False):
+            filename = os.path.basename(file_path)
+            try:
+                scores = score_dataframe(table.result())
+            except Exception as e:
+                print(f"Error scoring {filename}: {e}")
+                continue
+            
+            for column, row in scores.iterrows():
+                fractions = [row[name] for name in PATTERN_NAMES]
+                top_score = max(fractions)
+                top_pattern = PATTERN_NAMES[fractions.index(top_score)] if top_score > 0 else ''
+                writer.writerow([filename, column, int(row['values'])] +
+                                [f"{fraction:.4f}" for fraction in fractions] +
+                                [top_pattern, f"{top_score:.4f}"])
+    
+    print(f"Value pattern scores saved to: {output_file}")
+
 def main():
     """Main function to run the analysis."""
+    parser = argparse.ArgumentParser(description="Identify computer-generated vs human-annotated columns.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes used to classify files (default: 1)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Reclassify every file instead of reusing cached per-file results")
+    parser.add_argument('--sample', choices=['head', 'reservoir'], default='head',
+                        help="Sample the first rows of each file (head, default) or reservoir-sample "
+                             "values from the whole file in one bounded pass (reservoir)")
+    parser.add_argument('--sample-size', type=int, default=5,
+                        help="Values sampled per column in reservoir mode (default: 5)")
+    parser.add_argument('--row-budget', type=int, default=None,
+                        help="In reservoir mode, scan at most this many data rows per file")
+    parser.add_argument('--byte-budget', type=int, default=None,
+                        help="In reservoir mode, scan at most this many bytes per file")
+    parser.add_argument('--pattern-scores', action='store_true',
+                        help="Also score every value against the value patterns into "
+                             "column_value_pattern_scores.csv (needs pandas)")
+    add_prefetch_argument(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    
     # Define the directory containing CSV files
     ground_truth_dir = "ground_truth"
     
@@ -318,13 +900,25 @@ def main():
         print("Please ensure the script is run from the correct directory.")
         return
     
+    sampling = None
+    if args.sample == 'reservoir':
+        sampling = {'max_samples': args.sample_size, 'row_budget': args.row_budget, 'byte_budget': args.byte_budget}
+    
     # Run the analysis
-    results = analyze_csv_files(ground_truth_dir)
+    with collect_metrics('identify_computer_generated_columns', args.metrics, args.cprofile) as metrics:
+        results = analyze_csv_files(ground_truth_dir, workers=args.workers, use_cache=not args.no_cache,
+                                    metrics=metrics, sampling=sampling, prefetch=args.prefetch)
+        
+        if args.pattern_scores:
+            with metrics.stage('pattern_scores'):
+                write_value_pattern_scores(get_csv_files(ground_truth_dir), prefetch=args.prefetch)
     
     print(f"\nAnalysis complete! Check the generated CSV files for detailed results.")
     print("Files generated:")
     print("- computer_vs_human_columns_detailed.csv: Detailed per-file analysis")
     print("- column_classification_summary.csv: Summary by column type")
+    if args.pattern_scores:
+        print("- column_value_pattern_scores.csv: Fraction of values matching each pattern")
 
 if __name__ == "__main__":
     main()
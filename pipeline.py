@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Incremental runner for the dataset analysis pipeline.
+
+The analysis scripts are chained through files on disk. This runner knows
+which files each stage reads and writes, runs the stages in dependency
+order, and skips a stage when the content hash of its inputs (including the
+stage's script and the modules it imports) matches the last successful run.
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import subprocess
+from atomic_files import atomic_write
+from run_metrics import add_metrics_arguments, collect_metrics
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = '.pipeline_state.json'
+
+# Input and output patterns are relative to the base directory; each stage's
+# script and the modules it imports are read from this repository
+STAGES = [
+    {
+        'name': 'classify_columns',
+        'script': 'identify_computer_generated_columns.py',
+        'depends_on': [],
+        'modules': ['atomic_files.py', 'column_name_rules.csv', 'dataset_loader.py', 'run_metrics.py'],
+        'inputs': ['ground_truth/*.csv'],
+        'outputs': ['computer_vs_human_columns_detailed.csv', 'column_classification_summary.csv'],
+        'args': ['--workers', '{workers}']
+    },
+    {
+        'name': 'compare_to_schema',
+        'script': 'schema_column_comparison.py',
+        'depends_on': ['classify_columns'],
+        'modules': ['atomic_files.py', 'schema_index.py', 'fuzzy_match.py', 'run_metrics.py'],
+        'inputs': ['column_classification_summary.csv', 'NF.jsonld'],
+        'outputs': ['column_classification_summary_with_schema_flags.csv'],
+        'args': []
+    },
+    {
+        'name': 'extract_schema_columns',
+        'script': 'extract_schema_found_columns.py',
+        'depends_on': ['compare_to_schema'],
+        'modules': ['atomic_files.py', 'run_metrics.py'],
+        'inputs': ['column_classification_summary_with_schema_flags.csv'],
+        'outputs': ['columns_found_in_schema.csv'],
+        'args': []
+    },
+    {
+        'name': 'validate_values',
+        'script': 'validate_cell_values.py',
+        'depends_on': [],
+        'modules': ['atomic_files.py', 'schema_index.py', 'csv_cache.py', 'value_normalization.py', 'dataset_loader.py', 'run_metrics.py'],
+        'inputs': ['ground_truth/*.csv', 'NF.jsonld'],
+        'outputs': ['cell_validation_report.csv'],
+        'args': ['--base-dir', '{base_dir}']
+    },
+    {
+        'name': 'filter_evaluatable',
+        'script': 'filter_evaluatable_columns.py',
+        'depends_on': [],
+        'modules': ['atomic_files.py', 'csv_cache.py', 'dataset_loader.py', 'value_normalization.py', 'schema_index.py', 'run_metrics.py'],
+        'inputs': ['ground_truth/*.csv', 'CIM_curated_NF_schema_column_list_7_11_25.csv'],
+        'outputs': ['filtered_evaluatable_data/filtered_*.csv'],
+        'args': ['--base-dir', '{base_dir}', '--workers', '{workers}']
+    },
+    {
+        'name': 'compare_cim',
+        'script': 'compare_cim_vs_groundtruth.py',
+        'depends_on': [],
+        'modules': ['atomic_files.py', 'csv_cache.py', 'dataset_loader.py', 'value_normalization.py', 'schema_index.py', 'run_metrics.py'],
+        'inputs': ['ground_truth/nf_*.csv', 'CIM_update/filtered_nf_*.csv', 'NF.jsonld'],
+        'outputs': ['CIM_update/README.md'],
+        'args': ['--base-dir', '{base_dir}', '--workers', '{workers}']
+    }
+]
+
+def order_stages(stages):
+    """
+    Return stages sorted so every stage comes after the stages it depends on.
+    Stages without an ordering constraint keep their listed order.
+    """
+    by_name = {stage['name']: stage for stage in stages}
+    ordered = []
+    visiting = set()
+    done = set()
+    
+    def visit(stage):
+        if stage['name'] in done:
+            return
+        if stage['name'] in visiting:
+            raise ValueError(f"Dependency cycle at stage {stage['name']}")
+        visiting.add(stage['name'])
+        for dependency in stage['depends_on']:
+            if dependency not in by_name:
+                raise ValueError(f"Stage {stage['name']} depends on unknown stage {dependency}")
+            visit(by_name[dependency])
+        visiting.discard(stage['name'])
+        done.add(stage['name'])
+        ordered.append(stage)
+    
+    for stage in stages:
+        visit(stage)
+    return ordered
+
+def expand_patterns(base_dir, patterns):
+    """Return the sorted files under base_dir matching any of the glob patterns."""
+    files = set()
+    for pattern in patterns:
+        files.update(glob.glob(os.path.join(base_dir, pattern)))
+    return sorted(files)
+
+def hash_stage_inputs(stage, base_dir):
+    """
+    Hash the names and contents of a stage's input files, script and modules.
+    Returns None if a listed input pattern matches no files.
+    """
+    digest = hashlib.sha256()
+    for pattern in stage['inputs']:
+        if not expand_patterns(base_dir, [pattern]):
+            return None
+    
+    input_files = [(path, os.path.relpath(path, base_dir)) for path in expand_patterns(base_dir, stage['inputs'])]
+    for code_file in [stage['script']] + stage['modules']:
+        input_files.append((os.path.join(SCRIPT_DIR, code_file), code_file))
+    for path, name in input_files:
+        digest.update(name.encode('utf-8'))
+        digest.update(b'\0')
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def load_state(state_file):
+    """Load the input hashes recorded for each stage's last successful run."""
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state, state_file):
+    """Save the recorded input hashes, replacing the file in one step."""
+    with atomic_write(state_file, encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+def run_stage(name, command, base_dir, metrics=None):
+    """
+    Run the command of stage name in base_dir and return its exit code.
+    With metrics, the stage writes its own run metrics, which are attached
+    to the stage's entry along with its wall time.
+    """
+    if metrics is None:
+        return subprocess.run(command, cwd=base_dir).returncode
+    
+    fd, stage_metrics_file = tempfile.mkstemp(prefix='.stage_metrics.', suffix='.json')
+    os.close(fd)
+    try:
+        start_time = time.perf_counter()
+        returncode = subprocess.run(command + ['--metrics', stage_metrics_file], cwd=base_dir).returncode
+        seconds = time.perf_counter() - start_time
+        try:
+            with open(stage_metrics_file, 'r', encoding='utf-8') as f:
+                stage_metrics = json.load(f)
+        except (OSError, ValueError):
+            stage_metrics = None
+    finally:
+        os.remove(stage_metrics_file)
+    
+    metrics.add_stage(name, seconds, returncode=returncode, script_metrics=stage_metrics)
+    return returncode
+
+def run_pipeline(base_dir, workers=1, force=False, state_file=None, metrics=None):
+    """
+    Run every stage whose inputs changed since its last successful run.
+    
+    Args:
+        base_dir (str): Directory holding the dataset and the stage outputs
+        workers (int): Worker processes for stages that support --workers
+        force (bool): Run every stage regardless of recorded hashes
+        state_file (str): Path to the state file; defaults to base_dir/STATE_FILE
+        metrics (RunMetrics): Records each stage run and that stage's own metrics
+    
+    Returns:
+        dict: Stage name -> 'ran', 'skipped', 'missing inputs' or 'failed'
+    """
+    if state_file is None:
+        state_file = os.path.join(base_dir, STATE_FILE)
+    state = load_state(state_file)
+    outcomes = {}
+    
+    for stage in order_stages(STAGES):
+        name = stage['name']
+        print(f"\n[{name}]")
+        
+        failed_dependencies = [dep for dep in stage['depends_on'] if outcomes.get(dep) in ('failed', 'missing inputs')]
+        if failed_dependencies:
+            print(f"  Skipped: upstream stage(s) did not complete: {', '.join(failed_dependencies)}")
+            outcomes[name] = 'failed'
+            continue
+        
+        input_hash = hash_stage_inputs(stage, base_dir)
+        if input_hash is None:
+            print(f"  Skipped: no files match one of {stage['inputs']}")
+            outcomes[name] = 'missing inputs'
+            continue
+        
+        outputs_present = all(expand_patterns(base_dir, [pattern]) for pattern in stage['outputs'])
+        if not force and outputs_present and state.get(name) == input_hash:
+            print("  Up to date")
+            outcomes[name] = 'skipped'
+            continue
+        
+        command = [sys.executable, os.path.join(SCRIPT_DIR, stage['script'])]
+        command += [arg.format(base_dir=base_dir, workers=workers) for arg in stage['args']]
+        print(f"  Running: {' '.join(command)}")
+        sys.stdout.flush()
+        returncode = run_stage(name, command, base_dir, metrics)
+        
+        if returncode != 0:
+            print(f"  FAILED with exit code {returncode}")
+            state.pop(name, None)
+            outcomes[name] = 'failed'
+        else:
+            state[name] = input_hash
+            outcomes[name] = 'ran'
+        save_state(state, state_file)
+    
+    return outcomes
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the analysis pipeline, skipping stages whose inputs are unchanged.")
+    parser.add_argument('--base-dir', default=SCRIPT_DIR,
+                        help="Directory containing the dataset (default: this repository)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes for stages that support them (default: 1)")
+    parser.add_argument('--force', action='store_true',
+                        help="Run every stage even if its inputs are unchanged")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("RUNNING ANALYSIS PIPELINE")
+    print("=" * 60)
+    with collect_metrics('pipeline', args.metrics, args.cprofile) as metrics:
+        outcomes = run_pipeline(os.path.abspath(args.base_dir), workers=args.workers, force=args.force,
+                                metrics=metrics if args.metrics else None)
+    
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+    for name, outcome in outcomes.items():
+        print(f"{name}: {outcome}")
+    
+    if any(outcome == 'failed' for outcome in outcomes.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Run metrics for the analysis scripts.
+
+Each script's --metrics option records per-stage and per-file wall times,
+rows and bytes read, throughput and peak RSS, and writes them as JSON when
+the run ends. --cprofile additionally dumps cProfile statistics for the
+main process.
+"""
+
+import os
+import sys
+import json
+import time
+import cProfile
+import contextlib
+from atomic_files import atomic_write
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak RSS is then reported as None
+    resource = None
+
+def peak_rss_bytes(who='self'):
+    """
+    Return the peak resident set size in bytes.
+    
+    Args:
+        who (str): 'self' for this process, 'children' for the largest
+            finished child process (e.g. process pool workers)
+    
+    Returns:
+        int: Peak RSS in bytes, or None where it cannot be measured
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+def _rate(amount, seconds):
+    """Return amount per second, or None when either side is missing or zero."""
+    if not amount or not seconds:
+        return None
+    return round(amount / seconds, 3)
+
+class RunMetrics:
+    """Collects stage and per-file timings for one run of a script."""
+    
+    def __init__(self, name):
+        self.name = name
+        self.started = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.start_time = time.perf_counter()
+        self.stages = []
+        self.files = []
+    
+    @contextlib.contextmanager
+    def stage(self, name, **counts):
+        """
+        Time the enclosed block as a stage. Yields the stage's counts dict
+        (initially **counts) so the block can add counts such as 'rows'.
+        """
+        entry = dict(counts)
+        start_time = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            self.add_stage(name, time.perf_counter() - start_time, **entry)
+    
+    def add_stage(self, name, seconds, **counts):
+        """Record a stage timed by the caller, with optional counts such as rows."""
+        entry = {'name': name, 'seconds': round(seconds, 6), 'peak_rss_bytes': peak_rss_bytes()}
+        entry.update(counts)
+        self.stages.append(entry)
+    
+    def record_file(self, stage, file_path, seconds, rows=None, bytes_read=None, **details):
+        """
+        Record the work done on one file.
+        
+        Args:
+            stage (str): Name of the stage the file was processed in
+            file_path (str): Path to the file
+            seconds (float): Time spent on the file (None if unknown)
+            rows (int): Rows read from the file, if known
+            bytes_read (int): Bytes read; defaults to the file's size
+            **details: Extra fields stored with the entry (e.g. cached=True)
+        """
+        if bytes_read is None:
+            try:
+                bytes_read = os.path.getsize(file_path)
+            except OSError:
+                bytes_read = None
+        entry = {
+            'stage': stage,
+            'file': file_path,
+            'seconds': round(seconds, 6) if seconds is not None else None,
+            'rows': rows,
+            'bytes_read': bytes_read,
+            'rows_per_sec': _rate(rows, seconds)
+        }
+        entry.update(details)
+        self.files.append(entry)
+    
+    def to_dict(self):
+        """Return the run's metrics, with file totals and throughput added to each stage."""
+        stages = []
+        for stage in self.stages:
+            stage = dict(stage)
+            stage_files = [entry for entry in self.files if entry['stage'] == stage['name']]
+            if stage_files:
+                stage.setdefault('files', len(stage_files))
+                # A total is only known if every file's count is
+                rows = [entry['rows'] for entry in stage_files]
+                bytes_read = [entry['bytes_read'] for entry in stage_files]
+                stage.setdefault('rows', None if None in rows else sum(rows))
+                stage.setdefault('bytes_read', None if None in bytes_read else sum(bytes_read))
+            if 'rows' in stage:
+                stage['rows_per_sec'] = _rate(stage['rows'], stage['seconds'])
+            if 'bytes_read' in stage:
+                stage['bytes_per_sec'] = _rate(stage['bytes_read'], stage['seconds'])
+            stages.append(stage)
+        
+        return {
+            'script': self.name,
+            'argv': sys.argv[1:],
+            'started': self.started,
+            'total_seconds': round(time.perf_counter() - self.start_time, 6),
+            'peak_rss_bytes': peak_rss_bytes(),
+            'peak_children_rss_bytes': peak_rss_bytes('children'),
+            'stages': stages,
+            'files': self.files
+        }
+    
+    def write(self, output_file):
+        """Write the metrics as JSON via a temp file and rename."""
+        with atomic_write(output_file, encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+def add_metrics_arguments(parser):
+    """Add the --metrics and --cprofile options to an argparse parser."""
+    parser.add_argument('--metrics', metavar='FILE', default=None,
+                        help="Write per-stage and per-file timings, throughput and peak RSS to FILE as JSON")
+    parser.add_argument('--cprofile', metavar='FILE', default=None,
+                        help="Dump cProfile statistics of the main process to FILE (read with python -m pstats)")
+
+@contextlib.contextmanager
+def collect_metrics(name, metrics_file=None, cprofile_file=None):
+    """
+    Collect metrics for the enclosed run and write them when it ends.
+    
+    Args:
+        name (str): Script name stored in the metrics
+        metrics_file (str): JSON output path; None collects without writing
+        cprofile_file (str): cProfile output path; None disables profiling
+    
+    Yields:
+        RunMetrics: The collector to record stages and files on
+    """
+    metrics = RunMetrics(name)
+    profiler = cProfile.Profile() if cprofile_file else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield metrics
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_file)
+            print(f"cProfile statistics saved to: {cprofile_file}")
+        if metrics_file:
+            metrics.write(metrics_file)
+            print(f"Run metrics saved to: {metrics_file}")
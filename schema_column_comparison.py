@@ -5,45 +5,40 @@ Flag columns that are not found in the schema.
 """
 
 import pandas as pd
-import json
-import re
+import argparse
+from atomic_files import atomic_write
+from schema_index import load_schema_index
+from fuzzy_match import TrigramIndex
+from run_metrics import add_metrics_arguments, collect_metrics
 
 def extract_schema_properties(jsonld_file):
     """Extract all property names from the NF.jsonld schema"""
-    schema_properties = set()
-    
-    with open(jsonld_file, 'r') as f:
-        data = json.load(f)
-        
-    # Extract from @graph
-    if '@graph' in data:
-        for item in data['@graph']:
-            if 'rdfs:label' in item:
-                label = item['rdfs:label']
-                # Skip enum types and institution names
-                if not (label.endswith('Enum') or 
-                       any(keyword in label for keyword in [
-                           'University', 'College', 'Hospital', 'Institute', 
-                           'Laboratory', 'Medical', 'School', 'Center', 'Foundation'
-                       ])):
-                    schema_properties.add(label)
-    
-    return schema_properties
+    # Enum types and institution names are already skipped by the index
+    return set(load_schema_index(jsonld_file)['properties'])
 
 def load_column_summary(csv_file):
     """Load columns from the summary CSV"""
     df = pd.read_csv(csv_file)
     return set(df['Column'].str.strip())
 
-def compare_columns_to_schema(columns, schema_properties):
-    """Compare columns against schema properties"""
+def compare_columns_to_schema(columns, schema_properties, fuzzy_index=None):
+    """
+    Compare columns against schema properties.
+    Columns not found are looked up in a trigram index of the properties
+    (fuzzy_index, built from schema_properties if not given), and ranked
+    (property, score) suggestions are stored under results['suggestions'].
+    """
     results = {
         'found_in_schema': [],
         'not_found_in_schema': [],
         'case_sensitive_matches': [],
-        'case_insensitive_matches': []
+        'case_insensitive_matches': [],
+        'suggestions': {}
     }
     
+    if fuzzy_index is None:
+        fuzzy_index = TrigramIndex(schema_properties)
+    
     # Create case-insensitive lookup
     schema_lower = {prop.lower(): prop for prop in schema_properties}
     
@@ -59,6 +54,7 @@ def compare_columns_to_schema(columns, schema_properties):
             results['case_insensitive_matches'].append((column_clean, schema_match))
         else:
             results['not_found_in_schema'].append(column_clean)
+            results['suggestions'][column_clean] = fuzzy_index.search(column_clean)
     
     return results
 
@@ -66,45 +62,57 @@ def create_flagged_summary(summary_file, results):
     """Create a new summary file with flags for schema presence"""
     df = pd.read_csv(summary_file)
     
-    # Add schema status column
-    df['Schema_Status'] = 'Unknown'
-    df['Schema_Match'] = ''
+    # Build one lookup per flag; later categories win, as they did when applied in turn
+    status_by_column = {}
+    match_by_column = {}
     
     for column, match in results['found_in_schema']:
-        mask = df['Column'] == column
-        df.loc[mask, 'Schema_Status'] = 'Found (Exact)'
-        df.loc[mask, 'Schema_Match'] = match
+        status_by_column[column] = 'Found (Exact)'
+        match_by_column[column] = match
     
     for column, match in results['case_insensitive_matches']:
-        mask = df['Column'] == column
-        df.loc[mask, 'Schema_Status'] = 'Found (Case Insensitive)'
-        df.loc[mask, 'Schema_Match'] = match
+        status_by_column[column] = 'Found (Case Insensitive)'
+        match_by_column[column] = match
     
     for column in results['not_found_in_schema']:
-        mask = df['Column'] == column
-        df.loc[mask, 'Schema_Status'] = 'NOT FOUND IN SCHEMA'
-        df.loc[mask, 'Schema_Match'] = ''
+        status_by_column[column] = 'NOT FOUND IN SCHEMA'
+        match_by_column[column] = ''
+    
+    # Add schema status columns with a single vectorized lookup each
+    df['Schema_Status'] = df['Column'].map(status_by_column).fillna('Unknown')
+    df['Schema_Match'] = df['Column'].map(match_by_column).fillna('')
+    
+    suggestions_by_column = {
+        column: '; '.join(f"{match} ({score:.2f})" for match, score in suggestions)
+        for column, suggestions in results.get('suggestions', {}).items()
+    }
+    df['Schema_Suggestions'] = df['Column'].map(suggestions_by_column).fillna('')
     
     # Save flagged summary
     output_file = 'column_classification_summary_with_schema_flags.csv'
-    df.to_csv(output_file, index=False)
+    with atomic_write(output_file, newline='', encoding='utf-8') as f:
+        df.to_csv(f, index=False)
     print(f"Created flagged summary: {output_file}")
     
     return df
 
-def main():
+def run_schema_comparison(metrics):
+    """Compare the summary columns to the schema, timing each stage on metrics."""
     # Load data
     print("Loading schema properties from NF.jsonld...")
-    schema_properties = extract_schema_properties('NF.jsonld')
+    with metrics.stage('load_schema'):
+        schema_properties = extract_schema_properties('NF.jsonld')
     print(f"Found {len(schema_properties)} properties in schema")
     
     print("\nLoading columns from summary...")
-    columns = load_column_summary('column_classification_summary.csv')
+    with metrics.stage('load_summary'):
+        columns = load_column_summary('column_classification_summary.csv')
     print(f"Found {len(columns)} unique columns in summary")
     
     # Compare
     print("\nComparing columns to schema...")
-    results = compare_columns_to_schema(columns, schema_properties)
+    with metrics.stage('compare', columns=len(columns)):
+        results = compare_columns_to_schema(columns, schema_properties)
     
     # Report results
     print(f"\n=== SCHEMA COMPARISON RESULTS ===")
@@ -115,7 +123,11 @@ def main():
     
     print(f"\n=== COLUMNS NOT FOUND IN SCHEMA ===")
     for i, column in enumerate(results['not_found_in_schema'], 1):
-        print(f"{i:2d}. {column}")
+        suggestions = results['suggestions'].get(column)
+        if suggestions:
+            print(f"{i:2d}. {column} (did you mean: {', '.join(f'{match} {score:.2f}' for match, score in suggestions)})")
+        else:
+            print(f"{i:2d}. {column}")
     
     if results['case_insensitive_matches']:
         print(f"\n=== CASE INSENSITIVE MATCHES ===")
@@ -124,7 +136,8 @@ def main():
     
     # Create flagged summary
     print(f"\n=== Creating flagged summary ===")
-    create_flagged_summary('column_classification_summary.csv', results)
+    with metrics.stage('flagged_summary'):
+        create_flagged_summary('column_classification_summary.csv', results)
     
     # Summary by classification
     df = pd.read_csv('column_classification_summary.csv')
@@ -144,5 +157,13 @@ def main():
     for col in ha_not_found:
         print(f"  - {col}")
 
+def main():
+    parser = argparse.ArgumentParser(description="Flag summary columns that are not defined in the NF.jsonld schema.")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    
+    with collect_metrics('schema_column_comparison', args.metrics, args.cprofile) as metrics:
+        run_schema_comparison(metrics)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Pre-parsed index of the NF.jsonld schema, and a streaming reader for it.
+
+Parsing the full JSON-LD graph takes far longer than the scripts that need it
+spend using it, so the fields they look at (labels, lowercase lookups, enum
+values and validation rules) are compiled once into a compact pickle stored
+next to the schema. The index is reused until the schema's content hash
+changes.
+"""
+
+import os
+import json
+import pickle
+import hashlib
+from atomic_files import atomic_write
+
+# Bump when the layout of the index changes so stale indexes are rebuilt
+INDEX_VERSION = 1
+
+# The @graph fields the analysis scripts use; everything else is dropped on read
+SCHEMA_FIELDS = ('@id', '@type', 'rdfs:label', 'sms:displayName',
+                 'schema:rangeIncludes', 'sms:validationRules')
+
+# Labels containing these words are institution names, not properties
+INSTITUTION_KEYWORDS = [
+    'University', 'College', 'Hospital', 'Institute',
+    'Laboratory', 'Medical', 'School', 'Center', 'Foundation'
+]
+
+def is_schema_property_label(label):
+    """Return True unless the label is an enum type or an institution name."""
+    return not (label.endswith('Enum') or
+                any(keyword in label for keyword in INSTITUTION_KEYWORDS))
+
+# Characters that can follow a complete JSON value
+_VALUE_DELIMITERS = ',:]} \t\n\r'
+
+class _JsonStreamReader:
+    """Buffered reader over a text file that decodes one JSON value at a time."""
+    
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+    
+    def _fill(self, size):
+        """Drop the consumed part of the buffer and append up to size more characters."""
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+        self.buffer += chunk
+    
+    def peek(self):
+        """Skip whitespace and return the next character, or '' at end of file."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\n\r':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                return ''
+            self._fill(self.chunk_size)
+    
+    def expect(self, char):
+        """Consume char, the next non-whitespace character, or raise ValueError."""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, found {found!r}")
+        self.pos += 1
+    
+    def value(self):
+        """Decode and consume the next complete JSON value."""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number cut off by the buffer edge ('12.' of '12.5') also
+                # decodes, so only accept a value followed by a delimiter
+                if self.eof or (end < len(self.buffer) and self.buffer[end] in _VALUE_DELIMITERS):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill(size)
+            size *= 2
+
+def iter_schema_graph(jsonld_file, fields=SCHEMA_FIELDS, chunk_size=1 << 16):
+    """
+    Stream the entries of a JSON-LD file's top-level @graph one at a time.
+    
+    Only one graph entry is held in memory at once, plus a read buffer of
+    about chunk_size characters, so peak memory does not grow with the size
+    of the schema. Other top-level keys such as @context are decoded and
+    discarded.
+    
+    Args:
+        jsonld_file (str): Path to the JSON-LD schema
+        fields (tuple): Keys to keep from each entry; None keeps every key
+        chunk_size (int): Number of characters read from the file at a time
+    
+    Yields:
+        dict: One @graph entry, projected down to fields
+    """
+    with open(jsonld_file, 'r', encoding='utf-8') as f:
+        stream = _JsonStreamReader(f, chunk_size)
+        stream.expect('{')
+        if stream.peek() == '}':
+            return
+        
+        while True:
+            key = stream.value()
+            stream.expect(':')
+            
+            if key == '@graph':
+                stream.expect('[')
+                if stream.peek() == ']':
+                    stream.pos += 1
+                else:
+                    while True:
+                        item = stream.value()
+                        if fields is not None:
+                            item = {field: item[field] for field in fields if field in item}
+                        yield item
+                        if stream.peek() != ',':
+                            break
+                        stream.pos += 1
+                    stream.expect(']')
+            else:
+                stream.value()
+            
+            if stream.peek() != ',':
+                break
+            stream.pos += 1
+        stream.expect('}')
+
+def schema_content_hash(jsonld_file):
+    """Return the SHA-256 hex digest of the schema file's bytes."""
+    digest = hashlib.sha256()
+    with open(jsonld_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def default_index_file(jsonld_file):
+    """Return the index path used for a schema file, e.g. .NF.jsonld.index.pkl."""
+    directory, filename = os.path.split(os.path.abspath(jsonld_file))
+    return os.path.join(directory, f".{filename}.index.pkl")
+
+def build_schema_index(graph):
+    """
+    Compile schema @graph entries into the index.
+    
+    Args:
+        graph: Iterable of @graph entries (dicts)
+    
+    Returns:
+        dict: Index with these keys:
+            properties: set of property labels (enums and institutions skipped)
+            properties_lower: lowercase label -> label, for properties
+            display_names: label -> sms:displayName
+            enums: label -> frozenset of allowed values (display names of
+                the schema:rangeIncludes members)
+            validation_rules: label -> list of sms:validationRules
+    """
+    properties = set()
+    display_names = {}
+    labels_by_id = {}
+    ranges = {}
+    validation_rules = {}
+    
+    for item in graph:
+        if 'rdfs:label' not in item:
+            continue
+        label = item['rdfs:label']
+        display_name = item.get('sms:displayName', label)
+        display_names[label] = display_name
+        if '@id' in item:
+            labels_by_id[item['@id']] = label
+        
+        if is_schema_property_label(label):
+            properties.add(label)
+        
+        range_includes = item.get('schema:rangeIncludes')
+        if range_includes:
+            if isinstance(range_includes, dict):
+                range_includes = [range_includes]
+            ranges[label] = [member['@id'] for member in range_includes if '@id' in member]
+        
+        rules = item.get('sms:validationRules')
+        if rules:
+            validation_rules[label] = rules if isinstance(rules, list) else [rules]
+    
+    # Range members can appear anywhere in the graph, so resolve them last
+    enums = {}
+    for label, member_ids in ranges.items():
+        enums[label] = frozenset(
+            display_names[labels_by_id[member_id]]
+            for member_id in member_ids
+            if member_id in labels_by_id
+        )
+    
+    return {
+        'properties': properties,
+        'properties_lower': {prop.lower(): prop for prop in sorted(properties)},
+        'display_names': display_names,
+        'enums': enums,
+        'validation_rules': validation_rules
+    }
+
+def _write_index(index, index_file):
+    """Write the index via a temp file and rename, so readers never see a partial file."""
+    with atomic_write(index_file, 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_schema_index(jsonld_file='NF.jsonld', index_file=None):
+    """
+    Load the schema index, rebuilding it if the schema has changed.
+    
+    Args:
+        jsonld_file (str): Path to the JSON-LD schema
+        index_file (str): Path to the index; defaults to default_index_file()
+    
+    Returns:
+        dict: Index as described in build_schema_index
+    """
+    if index_file is None:
+        index_file = default_index_file(jsonld_file)
+    content_hash = schema_content_hash(jsonld_file)
+    
+    try:
+        with open(index_file, 'rb') as f:
+            cached = pickle.load(f)
+        if cached.get('version') == INDEX_VERSION and cached.get('schema_hash') == content_hash:
+            return cached['index']
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError, TypeError):
+        pass
+    
+    index = build_schema_index(iter_schema_graph(jsonld_file))
+    
+    try:
+        _write_index({'version': INDEX_VERSION, 'schema_hash': content_hash, 'index': index}, index_file)
+    except OSError as e:
+        print(f"WARNING: Could not write schema index {index_file}: {e}")
+    
+    return index
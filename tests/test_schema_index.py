@@ -0,0 +1,35 @@
+import json
+import pytest
+from schema_index import iter_schema_graph
+
+DOCUMENT = {
+    'a': 12.5,
+    '@context': {'rdfs': 'http://www.w3.org/2000/01/rdf-schema#', 'n': [1e-07, -3, 0.25]},
+    '@graph': [
+        {'@id': 'bts:A', 'rdfs:label': 'A', 'sms:displayName': 'alpha', 'extra': 123.456},
+        7.25,
+        {'@id': 'bts:B', 'rdfs:label': 'B', 'sms:validationRules': ['inRange 0 100'], 'n': -1e+20},
+        'text',
+        [1, 2.5, True, None],
+    ],
+    'z': -0.001,
+}
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 4, 5, 7, 9, 16, 1 << 16])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_graph_entries_survive_any_chunk_size(tmp_path, chunk_size, indent):
+    jsonld_file = tmp_path / 'schema.jsonld'
+    jsonld_file.write_text(json.dumps(DOCUMENT, indent=indent), encoding='utf-8')
+    
+    entries = list(iter_schema_graph(str(jsonld_file), fields=None, chunk_size=chunk_size))
+    
+    assert entries == DOCUMENT['@graph']
+
+@pytest.mark.parametrize('chunk_size', [3, 9, 100])
+def test_fields_are_projected(tmp_path, chunk_size):
+    jsonld_file = tmp_path / 'schema.jsonld'
+    jsonld_file.write_text(json.dumps({'@graph': [DOCUMENT['@graph'][0]]}), encoding='utf-8')
+    
+    entries = list(iter_schema_graph(str(jsonld_file), chunk_size=chunk_size))
+    
+    assert entries == [{'@id': 'bts:A', 'rdfs:label': 'A', 'sms:displayName': 'alpha'}]
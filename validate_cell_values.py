@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Validate ground truth cell values against the value constraints in NF.jsonld.
+
+Every column that maps to a schema property is checked against that
+property's allowed values (the display names of its schema:rangeIncludes
+members) and its sms:validationRules (num, int, inRange, list like). Each
+property's constraints are compiled once into a hash set and a list of
+checks. Each distinct value in a column is validated once, so whole
+columns are checked with vectorized membership tests. Placeholders for
+missing data ('NA', 'Unknown', 'Not Applicable') are skipped, and values
+that only differ from an allowed value in spelling (value_normalization)
+are counted as spelling variants rather than as invalid.
+"""
+
+import os
+import csv
+import argparse
+import numpy as np
+import pandas as pd
+from atomic_files import atomic_write
+from schema_index import load_schema_index
+from csv_cache import read_csv_cached
+from run_metrics import add_metrics_arguments, collect_metrics
+from value_normalization import load_normalizer
+from dataset_loader import add_prefetch_argument, ground_truth_files, load_tables
+
+# Invalid values (and spelling variants) listed per column in the report, most frequent first
+MAX_EXAMPLES = 5
+
+# Options for reading cells as the raw text in the file
+READ_OPTIONS = {'dtype': str, 'keep_default_na': False}
+
+def property_lookup(index):
+    """
+    Build lookups from column names to schema property labels.
+    Columns are matched to a property's display name first, then to its
+    label.
+    
+    Returns:
+        tuple: (exact, lowercase) dicts mapping a name to a label
+    """
+    exact = {}
+    for label, display_name in index['display_names'].items():
+        exact.setdefault(display_name, label)
+    for label in index['display_names']:
+        exact.setdefault(label, label)
+    
+    lowercase = {}
+    for name, label in exact.items():
+        lowercase.setdefault(name.lower(), label)
+    return exact, lowercase
+
+def parse_validation_rules(rules):
+    """
+    Parse sms:validationRules strings.
+    A malformed rule, such as an inRange rule whose bounds are not numbers,
+    is skipped with a warning and listed as unsupported.
+    
+    Returns:
+        tuple: (list_like, checks, unsupported) where checks is a list of
+            ('num',), ('int',) or ('inRange', low, high) tuples
+    """
+    list_like = False
+    checks = []
+    unsupported = []
+    for rule in rules:
+        parts = rule.split()
+        if not parts:
+            continue
+        if rule.strip() in ('list like', 'list'):
+            list_like = True
+        elif parts[0] in ('num', 'int'):
+            checks.append((parts[0],))
+        elif parts[0] == 'inRange' and len(parts) >= 3:
+            try:
+                checks.append(('inRange', float(parts[1]), float(parts[2])))
+            except ValueError:
+                print(f"WARNING: Skipping malformed validation rule {rule!r}")
+                unsupported.append(rule)
+        else:
+            unsupported.append(rule)
+    return list_like, checks, unsupported
+
+def compile_validators(index):
+    """
+    Compile each constrained property into a validator.
+    
+    Args:
+        index (dict): Schema index from load_schema_index
+    
+    Returns:
+        dict: label -> {'allowed': frozenset or None, 'list_like': bool,
+            'checks': list, 'unsupported': list}
+    """
+    validators = {}
+    for label in set(index['enums']) | set(index['validation_rules']):
+        list_like, checks, unsupported = parse_validation_rules(index['validation_rules'].get(label, []))
+        allowed = index['enums'].get(label) or None
+        if allowed is None and not checks:
+            continue
+        validators[label] = {
+            'allowed': allowed,
+            'list_like': list_like,
+            'checks': checks,
+            'unsupported': unsupported
+        }
+    return validators
+
+def _passes_checks(values, checks):
+    """Return a boolean array: which values pass every numeric check."""
+    numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+    valid = np.isfinite(numbers)
+    for check in checks:
+        if check[0] == 'int':
+            valid &= np.mod(numbers, 1) == 0
+        elif check[0] == 'inRange':
+            valid &= (numbers >= check[1]) & (numbers <= check[2])
+    return valid
+
+def _passes(values, validator):
+    """Return a boolean array: which values satisfy the validator."""
+    valid = np.ones(len(values), dtype=bool)
+    if validator['allowed'] is not None:
+        valid &= values.isin(validator['allowed']).to_numpy()
+    if validator['checks']:
+        valid &= _passes_checks(values, validator['checks'])
+    return valid
+
+def _most_frequent(counts, labels):
+    """Return up to MAX_EXAMPLES labels with a nonzero count, most frequent first."""
+    order = np.argsort(-counts, kind='stable')
+    return [labels[i] for i in order[:MAX_EXAMPLES] if counts[i] > 0]
+
+def validate_column(series, validator, normalizer=None):
+    """
+    Validate one column.
+    
+    Empty cells and placeholders for missing data (normalizer.is_null, e.g.
+    'NA' or 'Not Applicable') are skipped. A value that fails but whose
+    schema spelling (normalizer.canonical, e.g. 'genomicVariants' ->
+    'genomic variants') passes is a spelling variant, not an invalid value.
+    For list-like properties each comma-separated item is validated.
+    
+    Args:
+        series: pandas Series of the column's values
+        validator (dict): Validator from compile_validators
+        normalizer: ValueNormalizer from value_normalization; defaults to
+            load_normalizer(), which knows placeholders but no schema spellings
+    
+    Returns:
+        dict: 'checked' (values validated), 'invalid' (values failing),
+            'variants' (spelling variants of valid values), 'examples' (up
+            to MAX_EXAMPLES invalid values, most frequent first) and
+            'variant_examples' ('value -> schema spelling' strings)
+    """
+    if normalizer is None:
+        normalizer = load_normalizer()
+    values = series.dropna().astype(str).str.strip()
+    if validator['list_like']:
+        values = values.str.split(',').explode().str.strip()
+    values = values[values != '']
+    
+    codes, distinct = pd.factorize(values.to_numpy())
+    distinct = pd.Series(distinct, dtype=object)
+    present = ~normalizer.null_mask(distinct)
+    valid = _passes(distinct, validator)
+    
+    canonical = normalizer.canonicalize(distinct, keep_unmatched=False)
+    has_canonical = canonical.notna().to_numpy()
+    variant = ~valid & has_canonical
+    variant[variant] = _passes(canonical[variant], validator)
+    invalid = present & ~valid & ~variant
+    variant &= present
+    
+    present_counts = np.bincount(codes, weights=present[codes], minlength=len(distinct)).astype(int)
+    invalid_counts = np.where(invalid, present_counts, 0)
+    variant_counts = np.where(variant, present_counts, 0)
+    variant_labels = [f"{value} -> {canonical[i]}" for i, value in enumerate(distinct)]
+    
+    return {
+        'checked': int(present_counts.sum()),
+        'invalid': int(invalid_counts.sum()),
+        'variants': int(variant_counts.sum()),
+        'examples': _most_frequent(invalid_counts, distinct),
+        'variant_examples': _most_frequent(variant_counts, variant_labels)
+    }
+
+def validate_file(file_path, validators, lookup, normalizer=None, df=None):
+    """
+    Validate every constrained column of a CSV file.
+    
+    Args:
+        file_path (str): Path to the CSV file
+        validators (dict): Validators from compile_validators
+        lookup (tuple): Lookups from property_lookup
+        normalizer: ValueNormalizer passed to validate_column
+        df: The file already read with READ_OPTIONS (e.g. by load_tables);
+            None reads it here
+    
+    Returns:
+        list: One result dict per validated column, in file order
+    """
+    exact, lowercase = lookup
+    if df is None:
+        df = read_csv_cached(file_path, **READ_OPTIONS)
+    
+    results = []
+    for column in df.columns:
+        label = exact.get(column) or lowercase.get(column.lower())
+        if label not in validators:
+            continue
+        result = validate_column(df[column], validators[label], normalizer)
+        result.update({
+            'file_name': os.path.basename(file_path),
+            'column': column,
+            'property': label,
+            'rows': len(df)
+        })
+        results.append(result)
+    return results
+
+def write_validation_report(all_results, output_file):
+    """Write one row per validated column to a CSV file."""
+    with atomic_write(output_file, newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['File', 'Column', 'Schema_Property', 'Values_Checked', 'Invalid_Values',
+                         'Invalid_Fraction', 'Invalid_Examples', 'Spelling_Variants', 'Variant_Examples'])
+        for result in all_results:
+            fraction = result['invalid'] / result['checked'] if result['checked'] else 0.0
+            writer.writerow([result['file_name'], result['column'], result['property'], result['checked'],
+                             result['invalid'], f"{fraction:.4f}", ' | '.join(result['examples']),
+                             result['variants'], ' | '.join(result['variant_examples'])])
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate ground truth cell values against NF.jsonld.")
+    parser.add_argument('--base-dir', default='.',
+                        help="Directory containing ground_truth and NF.jsonld (default: current directory)")
+    parser.add_argument('--output', default='cell_validation_report.csv',
+                        help="Report file, relative to the base directory (default: cell_validation_report.csv)")
+    add_prefetch_argument(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    
+    with collect_metrics('validate_cell_values', args.metrics, args.cprofile) as metrics:
+        print("Compiling value constraints from NF.jsonld...")
+        with metrics.stage('compile'):
+            jsonld_file = os.path.join(args.base_dir, 'NF.jsonld')
+            index = load_schema_index(jsonld_file)
+            validators = compile_validators(index)
+            lookup = property_lookup(index)
+            normalizer = load_normalizer(jsonld_file)
+        print(f"Compiled {len(validators)} constrained properties")
+        
+        csv_files = ground_truth_files(args.base_dir)
+        print(f"Validating {len(csv_files)} files...\n")
+        
+        all_results = []
+        with metrics.stage('validate'):
+            for file_path, table in load_tables(csv_files, args.prefetch, **READ_OPTIONS):
+                try:
+                    results = validate_file(file_path, validators, lookup, normalizer, table.result())
+                except Exception as e:
+                    print(f"Error validating {os.path.basename(file_path)}: {e}")
+                    continue
+                all_results.extend(results)
+                invalid = sum(result['invalid'] for result in results)
+                variants = sum(result['variants'] for result in results)
+                print(f"{os.path.basename(file_path)}: {len(results)} columns validated, {invalid} invalid values, "
+                      f"{variants} spelling variants")
+        
+        output_file = os.path.join(args.base_dir, args.output)
+        write_validation_report(all_results, output_file)
+        
+        print("\n" + "=" * 60)
+        print("SUMMARY")
+        print("=" * 60)
+        print(f"Columns validated: {len(all_results)}")
+        print(f"Values checked: {sum(result['checked'] for result in all_results)}")
+        print(f"Invalid values: {sum(result['invalid'] for result in all_results)}")
+        print(f"Spelling variants: {sum(result['variants'] for result in all_results)}")
+        
+        invalid_by_column = {}
+        for result in all_results:
+            invalid_by_column[result['column']] = invalid_by_column.get(result['column'], 0) + result['invalid']
+        worst = sorted(((count, col) for col, count in invalid_by_column.items() if count), reverse=True)[:10]
+        if worst:
+            print("\nColumns with the most invalid values:")
+            for count, col in worst:
+                print(f"  {col}: {count}")
+        print(f"\nReport saved to: {output_file}")
+
+if __name__ == "__main__":
+    main()
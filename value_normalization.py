@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Shared value normalization for the comparison and filtering scripts.
+
+Raw cell values are reduced to a normalized token (casefolded, with
+whitespace, underscores and hyphens removed), so 'Not Applicable',
+'not_applicable' and 'NotApplicable' are the same token, as are
+'genomicVariants' and 'genomic variants'. Tokens decide which values are
+non-meaningful placeholders, and a table built from the NF.jsonld enums maps
+tokens back to the schema's canonical spelling. Arrays and Series are
+normalized once per distinct value in each call; nothing is kept between
+calls, so memory does not grow with the number of files processed.
+"""
+
+import re
+import numpy as np
+import pandas as pd
+from schema_index import load_schema_index
+
+# Symbols such as '+', '/' and '.' are kept: they carry meaning in values
+# like the genotypes '+/-' and '-/-'
+_SEPARATORS = re.compile(r'[\s_\-]+')
+
+# Tokens of values that stand for missing data ('Not Applicable', 'NA',
+# 'Unknown', 'nan'); values whose token is empty are missing too
+NULL_TOKENS = frozenset({'notapplicable', 'na', 'unknown', 'nan'})
+
+def normalize_token(value):
+    """Return the normalized token of a value: 'Not Applicable' -> 'notapplicable'."""
+    return _SEPARATORS.sub('', str(value).casefold())
+
+def build_normalization_table(index):
+    """
+    Map the token of every enum value in the schema to its canonical spelling.
+    
+    When several spellings share a token (e.g. 'Unknown' and 'UNKNOWN'),
+    the one used by the most enums wins, then the first in sorted order.
+    
+    Args:
+        index (dict): Schema index from load_schema_index
+    
+    Returns:
+        dict: token -> canonical value
+    """
+    spellings = {}
+    for values in index['enums'].values():
+        for value in values:
+            counts = spellings.setdefault(normalize_token(value), {})
+            counts[value] = counts.get(value, 0) + 1
+    
+    return {
+        token: min(counts, key=lambda value: (-counts[value], value))
+        for token, counts in spellings.items()
+    }
+
+class ValueNormalizer:
+    """Normalizes values to tokens and canonical schema values."""
+    
+    def __init__(self, table=None, null_tokens=NULL_TOKENS):
+        self.table = table or {}
+        self.null_tokens = null_tokens
+    
+    def token(self, value):
+        """Return the normalized token of a value."""
+        return normalize_token(value)
+    
+    def is_null(self, value):
+        """Return True if the value is NaN or a placeholder for missing data."""
+        if pd.isna(value):
+            return True
+        token = self.token(value)
+        return token == '' or token in self.null_tokens
+    
+    def canonical(self, value):
+        """Return the schema's spelling of a value, or None if no enum value matches."""
+        if pd.isna(value):
+            return None
+        return self.table.get(self.token(value))
+    
+    def _map_distinct(self, values, func):
+        """Apply func once per distinct value and broadcast the results to every cell."""
+        codes, distinct = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+        mapped = np.empty(len(distinct), dtype=object)
+        mapped[:] = [func(value) for value in distinct]
+        return mapped[codes]
+    
+    def tokens(self, values):
+        """Return an object array of the normalized tokens of an array or Series."""
+        return self._map_distinct(values, self.token)
+    
+    def null_mask(self, values):
+        """Return a boolean array marking the missing values in an array or Series."""
+        return self._map_distinct(values, self.is_null).astype(bool)
+    
+    def canonicalize(self, series, keep_unmatched=True):
+        """
+        Replace every value of a Series with the schema's spelling.
+        
+        Args:
+            series: pandas Series of raw values
+            keep_unmatched (bool): Keep values with no enum match as they
+                are; otherwise they become None
+        
+        Returns:
+            Series: Canonical values, with the index of series
+        """
+        if keep_unmatched:
+            mapped = self._map_distinct(series, lambda value: self.canonical(value) or value)
+        else:
+            mapped = self._map_distinct(series, self.canonical)
+        return pd.Series(mapped, index=series.index, name=series.name)
+
+_normalizers = {}
+
+def load_normalizer(jsonld_file=None):
+    """
+    Return the shared ValueNormalizer for a schema file, built once per process.
+    Without a schema file the normalizer only recognizes missing values.
+    """
+    if jsonld_file not in _normalizers:
+        table = build_normalization_table(load_schema_index(jsonld_file)) if jsonld_file else {}
+        _normalizers[jsonld_file] = ValueNormalizer(table)
+    return _normalizers[jsonld_file]
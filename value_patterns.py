@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Column-wide scoring of the computer-generated value patterns.
+
+identify_computer_generated_columns.py judges a column from a handful of
+sampled values, using the per-value checks in value_pattern. The scorer here
+applies the same per-value checks to every value of a column at once with pandas
+string operations, and reports the fraction of values matching each pattern,
+which serves as a confidence score for that pattern. Like the classifier,
+the UUID and hash checks are case-insensitive and the others are not, and
+'File handle ID' only counts in columns whose name contains 'handle'. The
+classifier's 'Consistent alphanumeric format' verdict compares the sampled
+values with each other rather than checking each value, so it has no score.
+"""
+
+import numpy as np
+import pandas as pd
+from csv_cache import read_csv_cached
+
+# Pattern name -> (regex, whether it is matched against the lowercased
+# value), in the order value_pattern checks them
+VALUE_PATTERNS = {
+    'UUID format': (r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', True),
+    'Hash-like hex string': (r'^[0-9a-f]{16,}$', True),
+    'Synapse ID format': (r'^syn\d+$', False),
+    'Long numeric ID': (r'^\d{10,}$', False),
+    'File handle ID': (r'^\d{6,}$', False),
+    'URL format': (r'^(?:http|https|ftp)://', False)
+}
+
+# Only counted in columns whose lowercased name contains 'handle'
+FILE_HANDLE_PATTERN = 'File handle ID'
+
+# Checked with plain substring tests: '/' plus either '.' or 'syn'
+FILE_PATH_PATTERN = 'File path format'
+
+PATTERN_NAMES = list(VALUE_PATTERNS) + [FILE_PATH_PATTERN]
+
+# Values ignored when scoring, as in the sampled classification
+IGNORED_VALUES = ['', 'NA']
+
+def _pattern_masks(distinct):
+    """
+    Return pattern name -> boolean array over a Series of distinct values.
+    distinct has object dtype, so matching uses Python's re and str.lower,
+    as the sampled checks do.
+    """
+    lowered = distinct.str.lower()
+    masks = {}
+    for name, (pattern, lowercase) in VALUE_PATTERNS.items():
+        target = lowered if lowercase else distinct
+        masks[name] = target.str.contains(pattern, regex=True).to_numpy(dtype=bool)
+    
+    path_mask = distinct.str.contains('/', regex=False) & (
+        distinct.str.contains('.', regex=False) | distinct.str.contains('syn', regex=False))
+    masks[FILE_PATH_PATTERN] = path_mask.to_numpy(dtype=bool)
+    return masks
+
+def score_dataframe(df):
+    """
+    Score every column of a DataFrame against every value pattern.
+    
+    Values are stripped, and empty and 'NA' values are ignored. All cells of
+    the frame are scanned as one array: each distinct value is matched once
+    per pattern, and the matches are summed per column with np.bincount, so
+    the cost does not grow with the number of columns.
+    
+    Returns:
+        DataFrame: One row per column (indexed by column name) with a
+            'values' count and, for each name in PATTERN_NAMES, the fraction
+            of those values matching it
+    """
+    n_columns = len(df.columns)
+    cells = pd.Series(df.to_numpy(dtype=object).ravel(order='F'), dtype=object)
+    column_codes = np.repeat(np.arange(n_columns), len(df))
+    
+    present = cells.notna().to_numpy()
+    values = cells[present].astype(str).str.strip()
+    column_codes = column_codes[present]
+    kept = ~values.isin(IGNORED_VALUES).to_numpy()
+    values = values[kept]
+    column_codes = column_codes[kept]
+    
+    value_codes, distinct = pd.factorize(values.to_numpy())
+    totals = np.bincount(column_codes, minlength=n_columns)
+    scores = pd.DataFrame({'values': totals}, index=df.columns)
+    handle_columns = np.array(['handle' in str(column).lower() for column in df.columns], dtype=bool)
+    
+    masks = _pattern_masks(pd.Series(distinct, dtype=object))
+    for name in PATTERN_NAMES:
+        weights = masks[name][value_codes]
+        if name == FILE_HANDLE_PATTERN:
+            weights = weights & handle_columns[column_codes]
+        matches = np.bincount(column_codes, weights=weights, minlength=n_columns)
+        scores[name] = matches / np.maximum(totals, 1)
+    return scores
+
+def score_value_patterns(series):
+    """
+    Score one column against every value pattern.
+    
+    Args:
+        series: pandas Series of the column's values
+    
+    Returns:
+        dict: 'values' (number of values scored) and the fraction of those
+            values matching each name in PATTERN_NAMES
+    """
+    row = score_dataframe(series.to_frame()).iloc[0]
+    return {'values': int(row['values']), **{name: float(row[name]) for name in PATTERN_NAMES}}
+
+def score_csv_file(file_path):
+    """Read a CSV file as text (through the CSV cache) and score every column."""
+    df = read_csv_cached(file_path, dtype=str, keep_default_na=False)
+    return score_dataframe(df)